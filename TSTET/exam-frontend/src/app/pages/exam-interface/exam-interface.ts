@@ -40,6 +40,16 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
   examName: string = "Exam";
   examId: number = 0;
   username: string = '';
+  submitting: boolean = false;
+
+  // Section chunks: which have arrived, which are in flight, and what to
+  // run once all of them have (building the results page needs the answers)
+  private paperLoaded = false;
+  private chunkHeaders: HttpHeaders | null = null;
+  private loadedSections = new Set<number>();
+  private loadingSections = new Set<number>();
+  private onChunksLoaded: (() => void) | null = null;
+  private destroyed = false;
 
   constructor(
     private http: HttpClient, 
@@ -82,22 +92,27 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
   fetchQuestions(token: string) {
     const headers = new HttpHeaders().set('Authorization', `Token ${token}`);
 
-    this.http.get<any[]>(`http://127.0.0.1:8000/api/exam/${this.examId}/questions/`, { headers }).subscribe({
-      next: (data) => {
-        if (data && data.length > 0) {
-          this.questions = data.map((q, index) => ({
-            id: q.id,
-            question_number: q.question_number || (index + 1),
-            text: q.text,
-            options: [q.option_1, q.option_2, q.option_3, q.option_4],
-            selectedOption: null,
-            correctOption: q.correct_option - 1,
-            sectionId: q.section_id,
-            sectionName: q.section_name || 'General Section',
-            status: 'not_visited'
-          }));
-
-          // Build sections from questions
+    // The manifest carries only ids and numbers; question text arrives per section
+    this.http.get<any>(`http://127.0.0.1:8000/api/exam/${this.examId}/manifest/`, { headers }).subscribe({
+      next: (manifest) => {
+        if (manifest && manifest.total_questions > 0) {
+          this.questions = [];
+          manifest.sections.forEach((sec: any) => {
+            sec.question_ids.forEach((id: number, i: number) => {
+              this.questions.push({
+                id: id,
+                question_number: sec.question_numbers[i],
+                text: 'Loading question...',
+                options: ['', '', '', ''],
+                selectedOption: null,
+                correctOption: -1,
+                sectionId: sec.id || null,
+                sectionName: sec.name || 'General Section',
+                status: 'not_visited'
+              });
+            });
+          });
+
           this.buildSections();
           
           if (this.questions.length > 0) {
@@ -110,16 +125,96 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
         this.restoreSavedAnswers();
         this.updateCurrentSection();
         this.cdr.detectChanges();
+
+        if (manifest && manifest.total_questions > 0) {
+          this.fetchSectionChunks(headers);
+        }
+        this.paperLoaded = true;
+        this.checkChunksLoaded();
       },
       error: (err) => {
         console.error('Failed to fetch questions:', err);
         this.loadDummyQuestions();
         this.restoreSavedAnswers();
         this.cdr.detectChanges();
+        this.paperLoaded = true;
+        this.checkChunksLoaded();
       }
     });
   }
 
+  fetchSectionChunks(headers: HttpHeaders) {
+    this.chunkHeaders = headers;
+    // Load the section the candidate is on first, then prefetch the rest
+    const current = this.sections[this.currentSectionIndex];
+    const rest = this.sections.filter(s => s !== current);
+    if (current) {
+      this.loadSection(current, 0, () => rest.forEach(section => this.loadSection(section)));
+    } else {
+      rest.forEach(section => this.loadSection(section));
+    }
+  }
+
+  private loadSection(section: Section, attempt: number = 0, done?: () => void) {
+    if (this.destroyed || !this.chunkHeaders || this.loadedSections.has(section.id)
+        || (attempt === 0 && this.loadingSections.has(section.id))) {
+      if (done) done();
+      return;
+    }
+    this.loadingSections.add(section.id);
+
+    this.http.get<any[]>(`http://127.0.0.1:8000/api/exam/${this.examId}/section/${section.id}/questions/`, { headers: this.chunkHeaders }).subscribe({
+      next: (data) => {
+        const byId = new Map<number, Question>(this.getSectionQuestions(section).map(q => [q.id, q] as [number, Question]));
+        data.forEach(q => {
+          const question = byId.get(q.id);
+          if (question) {
+            question.text = q.text;
+            question.options = [q.option_1, q.option_2, q.option_3, q.option_4];
+            question.correctOption = q.correct_option - 1;
+          }
+        });
+        this.loadingSections.delete(section.id);
+        this.loadedSections.add(section.id);
+        this.cdr.detectChanges();
+        if (done) done();
+        this.checkChunksLoaded();
+      },
+      error: (err) => {
+        console.error(`Failed to fetch section ${section.id}:`, err);
+        // Keep trying while the results wait on this chunk; otherwise give up
+        // after a few attempts and try again when the candidate enters it
+        if (attempt < 5 || this.onChunksLoaded) {
+          const retryAfter = Number(err.headers?.get('Retry-After'));
+          const delay = retryAfter > 0 ? retryAfter * 1000 : Math.min(1000 * 2 ** attempt, 30000);
+          setTimeout(() => this.loadSection(section, attempt + 1), delay);
+        } else {
+          this.loadingSections.delete(section.id);
+        }
+        if (done && attempt === 0) done();
+      }
+    });
+  }
+
+  private allChunksLoaded(): boolean {
+    // Dummy questions (no manifest) carry their answers already
+    return this.paperLoaded && (!this.chunkHeaders || this.sections.every(s => this.loadedSections.has(s.id)));
+  }
+
+  private checkChunksLoaded() {
+    if (this.onChunksLoaded && this.allChunksLoaded()) {
+      const callback = this.onChunksLoaded;
+      this.onChunksLoaded = null;
+      callback();
+    }
+  }
+
+  private whenChunksLoaded(callback: () => void) {
+    this.onChunksLoaded = callback;
+    this.sections.forEach(section => this.loadSection(section));
+    this.checkChunksLoaded();
+  }
+
   buildSections() {
     const sectionMap = new Map<number, Section>();
     let currentIndex = 0;
@@ -210,6 +305,11 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
         break;
       }
     }
+    // A section whose chunk failed earlier is fetched again on entry
+    const section = this.sections[this.currentSectionIndex];
+    if (section) {
+      this.loadSection(section);
+    }
   }
 
   startRobustTimer() {
@@ -317,7 +417,59 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
     return 'General Section';
   }
 
+  private postSubmission(payload: object, headers: HttpHeaders, keyName: string, retries: number) {
+    this.http.post('http://127.0.0.1:8000/api/submit-exam/', payload, { headers }).subscribe({
+      next: (res) => {
+        console.log('Exam saved to server:', res);
+        localStorage.removeItem(keyName);
+      },
+      error: (err) => {
+        // 409: the same submission is still being scored; retry with the same key
+        if (err.status === 409 && retries > 0) {
+          const delay = Number(err.headers?.get('Retry-After') || 1) * 1000;
+          setTimeout(() => this.postSubmission(payload, headers, keyName, retries - 1), delay);
+          return;
+        }
+        console.error('Failed to save to server:', err);
+      }
+    });
+  }
+
   submitExam() {
+    if (this.submitting) {
+      return;
+    }
+    this.submitting = true;
+
+    const token = localStorage.getItem('user_token');
+    if (token) {
+      // Reuse one key per exam so timer/button/proxy retries are absorbed server-side
+      const keyName = `exam_${this.examId}_submitKey`;
+      let submitKey = localStorage.getItem(keyName);
+      if (!submitKey) {
+        submitKey = crypto.randomUUID();
+        localStorage.setItem(keyName, submitKey);
+      }
+      const headers = new HttpHeaders()
+        .set('Authorization', `Token ${token}`)
+        .set('Idempotency-Key', submitKey);
+      const payload = {
+        exam_id: this.examId,
+        answers: this.questions.map(q => ({
+          question_id: q.id,
+          selected_option: q.selectedOption
+        }))
+      };
+
+      this.postSubmission(payload, headers, keyName, 5);
+    }
+
+    // The submission only needs ids and answers; the local results need
+    // every question's text and correct option
+    this.whenChunksLoaded(() => this.showResults());
+  }
+
+  private showResults() {
     const resultsData = this.questions.map(q => ({
       id: q.id,
       question_number: q.question_number,
@@ -333,23 +485,6 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
     localStorage.setItem('examResults', JSON.stringify(resultsData));
     localStorage.setItem('examSections', JSON.stringify(this.sections));
 
-    const token = localStorage.getItem('user_token');
-    if (token) {
-      const headers = new HttpHeaders().set('Authorization', `Token ${token}`);
-      const payload = {
-        exam_id: this.examId,
-        answers: this.questions.map(q => ({
-          question_id: q.id,
-          selected_option: q.selectedOption
-        }))
-      };
-
-      this.http.post('http://127.0.0.1:8000/api/submit-exam/', payload, { headers }).subscribe({
-        next: (res) => console.log('Exam saved to server:', res),
-        error: (err) => console.error('Failed to save to server:', err)
-      });
-    }
-
     localStorage.removeItem('examEndTime');
     localStorage.removeItem(`exam_${this.examId}_answers`);
     localStorage.removeItem(`exam_${this.examId}_currentIndex`);
@@ -358,6 +493,7 @@ export class ExamInterfaceComponent implements OnInit, OnDestroy {
   }
 
   ngOnDestroy() {
+    this.destroyed = true;
     if (this.timerInterval) {
       clearInterval(this.timerInterval);
     }
@@ -2,8 +2,11 @@ from django.contrib import admin
 from django.urls import path
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.http import HttpResponse
-from .models import Exam, Section, Question, StudentAttempt, QuestionStatus
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from .models import Exam, Section, Question, StudentAttempt, QuestionStatus, ArchivedAttempt
+from .export import export_response
+from .live import event_stream
 
 
 class SectionInline(admin.TabularInline):
@@ -23,6 +26,7 @@ class ExamAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'duration_minutes', 'section_count', 'question_count']
     search_fields = ['name']
     inlines = [SectionInline]
+    actions = ['export_candidate_results', 'export_question_results']
 
     def section_count(self, obj):
         return obj.sections.count()
@@ -32,20 +36,48 @@ class ExamAdmin(admin.ModelAdmin):
         return Question.objects.filter(exam=obj).count()
     question_count.short_description = 'Questions'
 
+    @admin.action(description='Export candidate results (CSV)')
+    def export_candidate_results(self, request, queryset):
+        return export_response('candidates', list(queryset.values_list('id', flat=True)))
+
+    @admin.action(description='Export per-question results (CSV)')
+    def export_question_results(self, request, queryset):
+        return export_response('questions', list(queryset.values_list('id', flat=True)))
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path('clear-history/', self.admin_site.admin_view(self.clear_history_view), name='clear_history'),
+            path('live-dashboard/', self.admin_site.admin_view(self.live_dashboard_view), name='live_dashboard'),
+            path('live-dashboard/stream/', self.admin_site.admin_view(self.live_stream_view), name='live_dashboard_stream'),
         ]
         return custom_urls + urls
 
+    def live_dashboard_view(self, request):
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Live Proctor Dashboard',
+            'exam_names': dict(Exam.objects.values_list('id', 'name')),
+        }
+        return TemplateResponse(request, 'admin/core/exam/live_dashboard.html', context)
+
+    def live_stream_view(self, request):
+        # Snapshots come from the workers' counters in the shared cache, so watchers add no queries
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     def clear_history_view(self, request):
         if request.method == 'POST':
             status_count = QuestionStatus.objects.count()
             attempt_count = StudentAttempt.objects.count()
+            archived_count = ArchivedAttempt.objects.count()
             QuestionStatus.objects.all().delete()
             StudentAttempt.objects.all().delete()
-            messages.success(request, f'Cleared {attempt_count} attempts and {status_count} statuses.')
+            # Archived attempts also block retakes, so they go too
+            ArchivedAttempt.objects.all().delete()
+            messages.success(request, f'Cleared {attempt_count} attempts, {archived_count} archived attempts and {status_count} statuses.')
             return redirect('admin:core_exam_changelist')
         
         html = f'''
@@ -59,6 +91,7 @@ class ExamAdmin(admin.ModelAdmin):
             </div>
             <div style="background: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
                 <p><strong>Student Attempts:</strong> {StudentAttempt.objects.count()}</p>
+                <p><strong>Archived Attempts:</strong> {ArchivedAttempt.objects.count()}</p>
                 <p><strong>Question Statuses:</strong> {QuestionStatus.objects.count()}</p>
             </div>
             <form method="post">
@@ -107,9 +140,18 @@ class StudentAttemptAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'exam__name']
     actions = ['delete_all_attempts']
 
-    @admin.action(description='Delete ALL attempts')
+    @admin.action(description='Delete ALL attempts (including archived)')
     def delete_all_attempts(self, request, queryset):
         QuestionStatus.objects.all().delete()
         count = StudentAttempt.objects.count()
+        archived_count = ArchivedAttempt.objects.count()
         StudentAttempt.objects.all().delete()
-        messages.success(request, f'Deleted all {count} attempts.')
\ No newline at end of file
+        ArchivedAttempt.objects.all().delete()
+        messages.success(request, f'Deleted all {count} attempts and {archived_count} archived attempts.')
+
+@admin.register(ArchivedAttempt)
+class ArchivedAttemptAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'exam', 'score', 'total', 'started_at', 'archived_at']
+    list_filter = ['exam']
+    search_fields = ['user__username', 'exam__name']
+    exclude = ['statuses']
@@ -0,0 +1,65 @@
+import json
+import zlib
+
+from django.db import transaction
+
+from .models import ArchivedAttempt, QuestionStatus
+
+
+def summarize_statuses(statuses):
+    """Return (correct, total, section_scores) for an iterable of QuestionStatus rows."""
+    correct = 0
+    total = 0
+    section_scores = {}
+    for status in statuses:
+        total += 1
+        section = status.question.section
+        section_id = section.id if section else 0
+        section_name = section.name if section else 'General'
+
+        if section_id not in section_scores:
+            section_scores[section_id] = {'name': section_name, 'correct': 0, 'total': 0}
+
+        section_scores[section_id]['total'] += 1
+
+        if status.selected_option is not None:
+            if (status.selected_option + 1) == status.question.correct_option:
+                correct += 1
+                section_scores[section_id]['correct'] += 1
+    return correct, total, section_scores
+
+
+def pack_statuses(statuses):
+    rows = [[s.question_id, s.selected_option, s.status] for s in statuses]
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack_statuses(blob):
+    """Decode an archived status blob into a list of dicts."""
+    rows = json.loads(zlib.decompress(bytes(blob)).decode('utf-8'))
+    return [
+        {'question_id': question_id, 'selected_option': selected, 'status': status}
+        for question_id, selected, status in rows
+    ]
+
+
+def archive_attempt(attempt):
+    """Move one StudentAttempt and its statuses into ArchivedAttempt."""
+    with transaction.atomic():
+        statuses = list(
+            QuestionStatus.objects.filter(attempt=attempt).select_related('question__section').order_by('id')
+        )
+        correct, total, section_scores = summarize_statuses(statuses)
+        archived = ArchivedAttempt.objects.create(
+            user_id=attempt.user_id,
+            exam_id=attempt.exam_id,
+            original_attempt_id=attempt.id,
+            started_at=attempt.started_at,
+            score=correct,
+            total=total,
+            section_scores=section_scores,
+            statuses=pack_statuses(statuses),
+        )
+        QuestionStatus.objects.filter(attempt=attempt).delete()
+        attempt.delete()
+    return archived
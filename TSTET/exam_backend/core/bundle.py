@@ -0,0 +1,177 @@
+"""Versioned, checksummed binary bundle of one exam paper.
+
+Layout:
+    header  MAGIC, format version (u16), index length (u32), SHA-256 of the rest
+    index   JSON: exam row, every section row, the paper manifest and the
+            offset/length of each section chunk
+    chunks  one zlib-compressed JSON list per manifest section, holding
+            questions exactly as the section endpoint serves them
+
+Only the index is parsed when a bundle is opened, so a node can mmap the
+file and serve any section by decompressing just its slice.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import Question, Section
+from .paper import _version, build_manifest, build_section_payload
+
+MAGIC = b'TSTETBND'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('>8sHI32s')
+
+logger = logging.getLogger(__name__)
+
+
+class BundleError(Exception):
+    pass
+
+
+def bundle_filename(exam_id):
+    return f'exam-{exam_id}.tstet'
+
+
+def write_bundle(exam_id, path):
+    """Write exam `exam_id` to `path`; returns the manifest or None if the exam does not exist."""
+    manifest = build_manifest(exam_id)
+    if manifest is None:
+        return None
+
+    chunks = []
+    blob = bytearray()
+    for section in manifest['sections']:
+        data = json.dumps([dict(q) for q in build_section_payload(exam_id, section['id'])], separators=(',', ':'))
+        compressed = zlib.compress(data.encode('utf-8'), 9)
+        chunks.append([section['id'], len(blob), len(compressed)])
+        blob += compressed
+
+    index = json.dumps({
+        'exam': {'id': manifest['exam_id'], 'name': manifest['name'], 'duration_minutes': manifest['duration_minutes']},
+        'sections': list(Section.objects.filter(exam_id=exam_id).order_by('order', 'part_number').values('id', 'name', 'part_number', 'order')),
+        'manifest': manifest,
+        'chunks': chunks,
+    }, separators=(',', ':')).encode('utf-8')
+
+    digest = hashlib.sha256(index + blob).digest()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(index), digest))
+        f.write(index)
+        f.write(blob)
+    return manifest
+
+
+class ExamBundle:
+    """Read-only view of a bundle file through mmap."""
+
+    def __init__(self, path, verify=True):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            # mmap refuses empty files, so a short file is rejected here
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise BundleError(f'{self.path}: truncated header')
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_index(verify)
+        except BundleError:
+            self._map.close()
+            raise
+        except (ValueError, KeyError, TypeError) as e:
+            self._map.close()
+            raise BundleError(f'{self.path}: unreadable index ({e})') from e
+
+    def _read_index(self, verify):
+        magic, version, index_length, digest = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise BundleError(f'{self.path}: not an exam bundle')
+        if version != FORMAT_VERSION:
+            raise BundleError(f'{self.path}: unsupported bundle version {version}')
+        body = memoryview(self._map)[HEADER.size:]
+        matches = not verify or hashlib.sha256(body).digest() == digest
+        body.release()
+        if not matches:
+            raise BundleError(f'{self.path}: checksum mismatch')
+
+        self.checksum = digest.hex()
+        self._blob_start = HEADER.size + index_length
+        if self._blob_start > len(self._map):
+            raise BundleError(f'{self.path}: index runs past the end of the file')
+        index = json.loads(self._map[HEADER.size:self._blob_start].decode('utf-8'))
+        self.exam = index['exam']
+        self.sections = index['sections']
+        self.manifest = index['manifest']
+        self._chunks = {section_id: (offset, length) for section_id, offset, length in index['chunks']}
+
+    def etag(self, part):
+        return f'"bundle-{self.checksum[:16]}-{part}"'
+
+    def section_questions(self, section_id):
+        """Questions of one section, or None if the bundle has no such section."""
+        if section_id not in self._chunks:
+            return None
+        offset, length = self._chunks[section_id]
+        start = self._blob_start + offset
+        return json.loads(zlib.decompress(self._map[start:start + length]).decode('utf-8'))
+
+    def questions(self):
+        return [q for section in self.manifest['sections'] for q in self.section_questions(section['id'])]
+
+    def close(self):
+        self._map.close()
+
+
+# bundle path -> (mtime_ns, paper version, ExamBundle or None if it failed to open)
+_open_bundles = {}
+
+
+def _check_paper(bundle, exam_id):
+    # Clients submit the question ids they were served, and those are
+    # scored against the database, so the paper in the bundle must be the
+    # one in the database, not just the same ids
+    if bundle.exam['id'] != exam_id or bundle.manifest != build_manifest(exam_id):
+        raise BundleError(f'{bundle.path}: questions do not match the database (import it with its ids)')
+    for section in bundle.manifest['sections']:
+        stored = [dict(q) for q in build_section_payload(exam_id, section['id'])]
+        if bundle.section_questions(section['id']) != stored:
+            raise BundleError(f'{bundle.path}: section {section["id"]} has been edited since the bundle was exported')
+
+
+def get_bundle(exam_id):
+    """Bundle for exam_id from PAPER_BUNDLE_DIR, or None to serve from the database.
+
+    A bundle is opened once per file modification and checked against the
+    database again whenever the paper's cache version moves (any admin edit
+    bumps it, in every worker); one that is corrupt or disagrees with the
+    database is logged and skipped until either changes. A missing file is
+    looked for again on the next call.
+    """
+    bundle_dir = getattr(settings, 'PAPER_BUNDLE_DIR', None)
+    if not bundle_dir:
+        return None
+    path = Path(bundle_dir) / bundle_filename(exam_id)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    version = _version(exam_id)
+    cached = _open_bundles.get(path)
+    if cached is not None and cached[0] == mtime and cached[1] == version:
+        return cached[2]
+    bundle = cached[2] if cached is not None and cached[0] == mtime else None
+    try:
+        if bundle is None:
+            bundle = ExamBundle(path)
+        _check_paper(bundle, exam_id)
+    except (OSError, BundleError) as e:
+        logger.error('Serving exam %s from the database: %s', exam_id, e)
+        bundle = None
+    _open_bundles[path] = (mtime, version, bundle)
+    return bundle
@@ -0,0 +1,188 @@
+import csv
+import heapq
+
+from django.db.models import Count, F, Q
+from django.http import StreamingHttpResponse
+
+from .archive import unpack_statuses
+from .models import ArchivedAttempt, Question, StudentAttempt, QuestionStatus
+
+EXPORT_CHUNK_SIZE = 2000
+
+CANDIDATE_COLUMNS = ['exam_id', 'attempt_id', 'username', 'started_at', 'score', 'total']
+QUESTION_COLUMNS = [
+    'exam_id', 'attempt_id', 'username', 'question_id', 'question_number',
+    'section', 'selected_option', 'correct_option', 'is_correct', 'status',
+]
+
+# Arrow types for the Parquet export, so batches never disagree on inferred types
+COLUMN_TYPES = {
+    'exam_id': 'int64', 'attempt_id': 'int64', 'username': 'string', 'started_at': 'string',
+    'score': 'int64', 'total': 'int64', 'question_id': 'int64', 'question_number': 'int64',
+    'section': 'string', 'selected_option': 'int64', 'correct_option': 'int64',
+    'is_correct': 'bool', 'status': 'string',
+}
+
+
+def iter_candidate_rows(exam_ids):
+    """One row per attempt, live or archived; live scores are aggregated in the database."""
+    attempts = (
+        StudentAttempt.objects.filter(exam_id__in=exam_ids, completed=True)
+        .annotate(
+            total=Count('questionstatus'),
+            score=Count(
+                'questionstatus',
+                filter=Q(questionstatus__selected_option=F('questionstatus__question__correct_option') - 1),
+            ),
+        )
+        .order_by('exam_id', 'id')
+        .values_list('exam_id', 'id', 'user__username', 'started_at', 'score', 'total')
+    )
+    archived = (
+        ArchivedAttempt.objects.filter(exam_id__in=exam_ids)
+        .order_by('exam_id', 'original_attempt_id')
+        .values_list('exam_id', 'original_attempt_id', 'user__username', 'started_at', 'score', 'total')
+    )
+    # Archived attempts keep their original id and precomputed score
+    rows = heapq.merge(
+        attempts.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+        archived.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+        key=_attempt_order,
+    )
+    for exam_id, attempt_id, username, started_at, score, total in rows:
+        yield [exam_id, attempt_id, username, started_at.isoformat(), score, total]
+
+
+def _attempt_order(row):
+    return row[0], row[1]
+
+
+def iter_question_rows(exam_ids):
+    """One row per answered/unanswered question of every attempt, live or archived."""
+    statuses = (
+        QuestionStatus.objects.filter(attempt__exam_id__in=exam_ids)
+        .order_by('attempt__exam_id', 'attempt_id', 'id')
+        .values_list(
+            'attempt__exam_id', 'attempt_id', 'attempt__user__username', 'question_id',
+            'question__question_number', 'question__section__name', 'selected_option',
+            'question__correct_option', 'status',
+        )
+    )
+    rows = heapq.merge(
+        statuses.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+        _archived_question_rows(exam_ids),
+        key=_attempt_order,
+    )
+    for exam_id, attempt_id, username, question_id, number, section, selected, correct, status in rows:
+        # selected_option is stored 0-based, correct_option 1-based; export both 1-based
+        chosen = selected + 1 if selected is not None else None
+        yield [exam_id, attempt_id, username, question_id, number, section or 'General', chosen, correct, chosen is not None and chosen == correct, status]
+
+
+
+def _archived_question_rows(exam_ids):
+    """Unpacked statuses of archived attempts, shaped like the live values_list rows."""
+    questions = {}
+    for question_id, number, section, correct in (
+        Question.objects.filter(exam_id__in=exam_ids)
+        .values_list('id', 'question_number', 'section__name', 'correct_option')
+    ):
+        questions[question_id] = (number, section, correct)
+
+    archived = (
+        ArchivedAttempt.objects.filter(exam_id__in=exam_ids)
+        .order_by('exam_id', 'original_attempt_id')
+        .values_list('exam_id', 'original_attempt_id', 'user__username', 'statuses')
+    )
+    for exam_id, attempt_id, username, blob in archived.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        for status in unpack_statuses(blob):
+            # A question deleted since archiving still exports its answer
+            number, section, correct = questions.get(status['question_id'], (None, None, None))
+            yield (
+                exam_id, attempt_id, username, status['question_id'],
+                number, section, status['selected_option'], correct, status['status'],
+            )
+
+
+EXPORTS = {
+    'candidates': (CANDIDATE_COLUMNS, iter_candidate_rows),
+    'questions': (QUESTION_COLUMNS, iter_question_rows),
+}
+
+
+class _Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in pieces."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(columns, rows, batch_size=EXPORT_CHUNK_SIZE * 10):
+    """Yield a Parquet file one row group at a time. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, COLUMN_TYPES[name]) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    batch = []
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, r)) for r in batch], schema=schema))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_table(pa.Table.from_pylist([dict(zip(columns, r)) for r in batch], schema=schema))
+    writer.close()
+    yield sink.drain()
+
+
+def export_response(kind, exam_ids, fmt='csv'):
+    """StreamingHttpResponse with the given export for the given exams."""
+    columns, iter_rows = EXPORTS[kind]
+    rows = iter_rows(exam_ids)
+    name = f"results-{kind}-{'-'.join(str(i) for i in exam_ids)}"
+    if fmt == 'parquet':
+        response = StreamingHttpResponse(stream_parquet(columns, rows), content_type='application/vnd.apache.parquet')
+        response['Content-Disposition'] = f'attachment; filename="{name}.parquet"'
+    else:
+        response = StreamingHttpResponse(stream_csv(columns, rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+    return response
@@ -0,0 +1,254 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Seconds between dashboard snapshots pushed over Server-Sent Events.
+LIVE_DASHBOARD_INTERVAL = getattr(settings, 'LIVE_DASHBOARD_INTERVAL', 2)
+# Snapshots per SSE response before the browser is asked to reconnect.
+LIVE_STREAM_EVENTS = getattr(settings, 'LIVE_STREAM_EVENTS', 15)
+# How often each worker writes its counters to the shared cache, and how
+# long a silent worker's counters are kept there.
+LIVE_PUBLISH_INTERVAL = LIVE_DASHBOARD_INTERVAL
+LIVE_WORKER_TTL = 24 * 3600
+WORKERS_KEY = 'live:workers'
+SNAPSHOT_KEY = 'live:snapshot'
+ROLLING_WINDOW = 60
+
+
+class RollingCounter:
+    """Event count over the last `window` seconds, kept in one-second buckets."""
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.counts = [0] * window
+        self.stamps = [0] * window
+
+    def add(self, now, n=1):
+        second = int(now)
+        i = second % self.window
+        if self.stamps[i] != second:
+            self.stamps[i] = second
+            self.counts[i] = 0
+        self.counts[i] += n
+
+    def total(self, now):
+        second = int(now)
+        return sum(c for c, s in zip(self.counts, self.stamps) if second - s < self.window)
+
+    def state(self, now):
+        """{second: count} for the seconds still inside the window."""
+        second = int(now)
+        return {s: c for c, s in zip(self.counts, self.stamps) if c and second - s < self.window}
+
+    @staticmethod
+    def merged_total(states, now, window=ROLLING_WINDOW):
+        second = int(now)
+        return sum(c for state in states for s, c in state.items() if second - s < window)
+
+
+class ExamCounters:
+
+    def __init__(self):
+        self.started = set()
+        self.submitted = 0
+        self.score_sum = 0
+        self.question_sum = 0
+        self.recent_starts = RollingCounter()
+        self.recent_submits = RollingCounter()
+
+    def state(self, now):
+        return {
+            'started': set(self.started),
+            'submitted': self.submitted,
+            'score_sum': self.score_sum,
+            'question_sum': self.question_sum,
+            'recent_starts': self.recent_starts.state(now),
+            'recent_submits': self.recent_submits.state(now),
+        }
+
+
+class EventAggregator:
+    """Live exam counters updated in O(1) by the API views.
+
+    Each worker counts its own events and publishes them to the shared
+    cache at most once per LIVE_PUBLISH_INTERVAL (a timer flushes the last
+    changes of a worker that goes quiet). snapshot() merges every worker's
+    published counters; user sets are unioned, so logins and starts are
+    not double counted across workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._pid = None
+        self._flush_timer = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.logged_in = set()
+            self.recent_logins = RollingCounter()
+            self.exams = {}
+            self._published_at = 0
+            self._cancel_flush()
+
+    def _exam(self, exam_id):
+        counters = self.exams.get(exam_id)
+        if counters is None:
+            counters = self.exams[exam_id] = ExamCounters()
+        return counters
+
+    def record_login(self, user_id):
+        now = time.time()
+        with self.lock:
+            self.logged_in.add(user_id)
+            self.recent_logins.add(now)
+            due = self._changed(now)
+        if due:
+            self.publish()
+
+    def record_start(self, exam_id, user_id):
+        now = time.time()
+        with self.lock:
+            counters = self._exam(exam_id)
+            if user_id in counters.started:
+                return
+            counters.started.add(user_id)
+            counters.recent_starts.add(now)
+            due = self._changed(now)
+        if due:
+            self.publish()
+
+    def record_submit(self, exam_id, user_id, score, total):
+        now = time.time()
+        with self.lock:
+            counters = self._exam(exam_id)
+            counters.started.add(user_id)
+            counters.submitted += 1
+            counters.score_sum += score
+            counters.question_sum += total
+            counters.recent_submits.add(now)
+            due = self._changed(now)
+        if due:
+            self.publish()
+
+    def _changed(self, now):
+        # Called with self.lock held; True means publish now, after releasing it
+        wait = self._published_at + LIVE_PUBLISH_INTERVAL - now
+        if wait <= 0:
+            self._published_at = now
+            return True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(wait, self.publish)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+        return False
+
+    def _cancel_flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _worker_key(self):
+        # Forked workers inherit the parent's aggregator, so key on the pid
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._worker_id = f'{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}'
+        return f'live:worker:{self._worker_id}'
+
+    def publish(self):
+        """Write this worker's counters to the shared cache."""
+        now = time.time()
+        with self.lock:
+            self._cancel_flush()
+            self._published_at = now
+            state = {
+                'logged_in': set(self.logged_in),
+                'recent_logins': self.recent_logins.state(now),
+                'exams': {exam_id: c.state(now) for exam_id, c in self.exams.items()},
+            }
+            key = self._worker_key()
+        cache.set(key, state, LIVE_WORKER_TTL)
+        workers = cache.get(WORKERS_KEY) or []
+        if key not in workers:
+            cache.set(WORKERS_KEY, [*workers, key], None)
+
+    def snapshot(self, max_age=0):
+        """Counters of all workers; reuses a shared snapshot younger than max_age seconds."""
+        now = time.time()
+        cached = cache.get(SNAPSHOT_KEY) if max_age else None
+        if cached is not None and now - cached['generated_at'] < max_age:
+            return cached
+
+        self.publish()
+        workers = cache.get(WORKERS_KEY) or []
+        states = cache.get_many(workers)
+        if len(states) < len(workers):
+            # Workers idle for LIVE_WORKER_TTL have expired
+            cache.set(WORKERS_KEY, [key for key in workers if key in states], None)
+        snapshot = merge_states(states.values(), now)
+        if max_age:
+            cache.set(SNAPSHOT_KEY, snapshot, max_age)
+        return snapshot
+
+
+def merge_states(states, now):
+    """Combine published worker counters into one dashboard snapshot."""
+    logged_in = set()
+    recent_logins = []
+    exams = {}
+    for state in states:
+        logged_in |= state['logged_in']
+        recent_logins.append(state['recent_logins'])
+        for exam_id, counters in state['exams'].items():
+            merged = exams.setdefault(exam_id, {
+                'started': set(), 'submitted': 0, 'score_sum': 0, 'question_sum': 0,
+                'recent_starts': [], 'recent_submits': [],
+            })
+            merged['started'] |= counters['started']
+            merged['submitted'] += counters['submitted']
+            merged['score_sum'] += counters['score_sum']
+            merged['question_sum'] += counters['question_sum']
+            merged['recent_starts'].append(counters['recent_starts'])
+            merged['recent_submits'].append(counters['recent_submits'])
+
+    return {
+        'generated_at': now,
+        'logged_in': len(logged_in),
+        'logins_last_minute': RollingCounter.merged_total(recent_logins, now),
+        'exams': {
+            exam_id: {
+                'started': len(c['started']),
+                'submitted': c['submitted'],
+                'in_progress': max(len(c['started']) - c['submitted'], 0),
+                'average_score': round(c['score_sum'] / c['submitted'], 2) if c['submitted'] else None,
+                'average_percent': round(100 * c['score_sum'] / c['question_sum'], 1) if c['question_sum'] else None,
+                'starts_last_minute': RollingCounter.merged_total(c['recent_starts'], now),
+                'submits_last_minute': RollingCounter.merged_total(c['recent_submits'], now),
+            }
+            for exam_id, c in exams.items()
+        },
+    }
+
+
+aggregator = EventAggregator()
+
+
+def event_stream(interval=LIVE_DASHBOARD_INTERVAL, events=LIVE_STREAM_EVENTS):
+    """Server-Sent Events generator pushing a snapshot every `interval` seconds.
+
+    Ends after `events` snapshots so a dashboard tab does not hold a worker
+    indefinitely; the retry field tells EventSource to reconnect after one
+    interval, which continues the feed.
+    """
+    yield f'retry: {int(interval * 1000)}\n\n'
+    for n in range(events):
+        if n:
+            time.sleep(interval)
+        # Every open stream, in any worker, shares one snapshot per tick
+        yield f'data: {json.dumps(aggregator.snapshot(max_age=interval / 2))}\n\n'
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import StudentAttempt
+from core.archive import archive_attempt
+
+
+class Command(BaseCommand):
+    help = 'Move old or closed-exam attempts out of the live tables into compressed archive rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, help='Archive attempts started more than N days ago')
+        parser.add_argument('--exam-id', type=int, action='append', help='Archive all attempts of a closed exam (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    def handle(self, *args, **options):
+        if options['older_than'] is None and not options['exam_id']:
+            self.stdout.write(self.style.ERROR('Provide --older-than and/or --exam-id'))
+            return
+
+        attempts = StudentAttempt.objects.filter(completed=True)
+        if options['older_than'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['older_than'])
+            attempts = attempts.filter(started_at__lt=cutoff)
+        if options['exam_id']:
+            attempts = attempts.filter(exam_id__in=options['exam_id'])
+
+        if options['dry_run']:
+            self.stdout.write(f'Would archive {attempts.count()} attempts')
+            return
+
+        # Snapshot ids first so rows are not deleted under an open cursor
+        attempt_ids = list(attempts.order_by('id').values_list('id', flat=True))
+        count = 0
+        for start in range(0, len(attempt_ids), 500):
+            batch = attempt_ids[start:start + 500]
+            for attempt in StudentAttempt.objects.filter(id__in=batch).order_by('id'):
+                archive_attempt(attempt)
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {count} attempts'))
@@ -0,0 +1,72 @@
+import timeit
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from core import ratelimit
+from core.tokens import user_tokens, verify_token
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request cost of the rate limiter against verify_token'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200000, help='Calls per measurement')
+        parser.add_argument('--users', type=int, default=10000, help='Distinct users for the spread-out run')
+        parser.add_argument('--shared-cache', default='default', help='Cache alias to measure shared mode against')
+        parser.add_argument('--shared-number', type=int, default=2000, help='Calls per shared-mode measurement')
+
+    def handle(self, *args, **options):
+        number = options['number']
+        users = options['users']
+        token = 'bench-token'
+        user_tokens[token] = 1
+        # Refills instantly, so every call takes the allowed path
+        ratelimit.RATE_LIMITS['bench'] = (60, 10 ** 9)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token}')
+        response = Response()
+        check = ratelimit.check
+        shared_setting = ratelimit.RATE_LIMIT_CACHE
+        counter = iter(range(10 ** 12))
+
+        def first_verify():
+            request.__dict__.pop('token_user_id', None)
+            return verify_token(request)
+
+        def limiter():
+            return check(1, 'bench')
+
+        def limiter_spread():
+            return check(next(counter) % users, 'bench')
+
+        def set_headers():
+            response['RateLimit-Limit'] = '60'
+            response['RateLimit-Remaining'] = '59'
+            response['RateLimit-Reset'] = '1'
+
+        try:
+            verify_token(request)
+            for label, func, calls in [
+                ('verify_token (first call)', first_verify, number),
+                ('verify_token (memoised)', lambda: verify_token(request), number),
+                ('check + header values, one user', limiter, number),
+                (f'check + header values, {users} users', limiter_spread, number),
+                ('writing the three headers', set_headers, number),
+            ]:
+                self.report(label, func, calls)
+
+            # Shared mode does two cache round trips per check
+            alias = options['shared_cache']
+            backend = type(caches[alias]).__name__
+            ratelimit.RATE_LIMIT_CACHE = alias
+            self.report(f'check, shared via {backend}', limiter, options['shared_number'])
+            caches[alias].delete('ratelimit:bench:1')
+        finally:
+            ratelimit.RATE_LIMIT_CACHE = shared_setting
+            user_tokens.pop(token, None)
+            ratelimit.RATE_LIMITS.pop('bench', None)
+            ratelimit.reset()
+
+    def report(self, label, func, calls):
+        best = min(timeit.repeat(func, number=calls, repeat=5)) / calls
+        self.stdout.write(f'{label:<40} {best * 1e9:10.0f} ns')
@@ -0,0 +1,23 @@
+import os
+from django.core.management.base import BaseCommand
+from core.bundle import bundle_filename, write_bundle
+
+
+class Command(BaseCommand):
+    help = 'Export an exam paper to a checksummed binary bundle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int, help='Exam ID to export')
+        parser.add_argument('--output', type=str, help='Bundle path (default: exam-<id>.tstet)')
+
+    def handle(self, *args, **options):
+        path = options['output'] or bundle_filename(options['exam_id'])
+        manifest = write_bundle(options['exam_id'], path)
+        if manifest is None:
+            self.stdout.write(self.style.ERROR(f'Exam ID {options["exam_id"]} not found'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {manifest["name"]}: {len(manifest["sections"])} sections, '
+            f'{manifest["total_questions"]} questions, {os.path.getsize(path)} bytes -> {path}'
+        ))
@@ -0,0 +1,142 @@
+import math
+import random
+import time
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.models import Exam, Section, Question, StudentAttempt, QuestionStatus
+
+WORDS = (
+    'child learning teacher classroom method theory development language reading '
+    'number fraction area plant water energy society motivation assessment memory '
+    'concept skill activity pupil curriculum evaluation example principle stage'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset (exams, users, attempts) for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exams', type=int, default=1, help='Number of exams')
+        parser.add_argument('--sections', type=int, default=5, help='Sections per exam')
+        parser.add_argument('--questions', type=int, default=150, help='Questions per exam')
+        parser.add_argument('--users', type=int, default=1000, help='Number of candidate users')
+        parser.add_argument('--attempts', type=int, default=1000, help='Attempts per exam (at most one per user)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+        parser.add_argument('--prefix', type=str, default='synthetic', help='Prefix for generated exam and user names')
+        parser.add_argument('--password', type=str, default='password', help='Password for every generated user')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if (User.objects.filter(username__startswith=f'{prefix}_user_').exists()
+                or Exam.objects.filter(name__startswith=f'{prefix} exam ').exists()):
+            self.stdout.write(self.style.ERROR(
+                f'Data with prefix "{prefix}" already exists; pass a different --prefix or delete it first'
+            ))
+            return
+        started = time.monotonic()
+
+        users = self.create_users(prefix, options['users'], options['password'])
+        self.stdout.write(f'Created {len(users)} users')
+
+        status_total = 0
+        for n in range(1, options['exams'] + 1):
+            exam, questions = self.create_exam(f'{prefix} exam {n}', options['sections'], options['questions'])
+            attempt_count = min(options['attempts'], len(users))
+            statuses = self.create_attempts(exam, questions, self.rng.sample(users, attempt_count))
+            status_total += statuses
+            self.stdout.write(f'  {exam.name}: {len(questions)} questions, {attempt_count} attempts, {statuses} statuses')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {status_total} question statuses in {elapsed:.1f}s ({status_total / max(elapsed, 1e-9):,.0f} rows/s)'
+        ))
+
+    def sentence(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize()
+
+    def create_users(self, prefix, count, password):
+        # Hash once: make_password is deliberately slow
+        password_hash = make_password(password)
+        users = [
+            User(username=f'{prefix}_user_{i}', password=password_hash)
+            for i in range(1, count + 1)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_exam(self, name, section_count, question_count):
+        with transaction.atomic():
+            exam = Exam.objects.create(name=name, duration_minutes=150)
+            sections = Section.objects.bulk_create([
+                Section(exam=exam, name=self.sentence(2, 4), part_number=i, order=i)
+                for i in range(1, section_count + 1)
+            ])
+            per_section = math.ceil(question_count / max(section_count, 1))
+            questions = []
+            for number in range(1, question_count + 1):
+                text = self.sentence(8, 25) + '?'
+                if self.rng.random() < 0.1:
+                    # Occasional reading-comprehension passage
+                    text = ' '.join(self.sentence(10, 20) + '.' for _ in range(self.rng.randint(5, 15))) + ' ' + text
+                questions.append(Question(
+                    exam=exam,
+                    section=sections[min((number - 1) // per_section, len(sections) - 1)] if sections else None,
+                    question_number=number,
+                    text=text,
+                    option_1=self.sentence(1, 6),
+                    option_2=self.sentence(1, 6),
+                    option_3=self.sentence(1, 6),
+                    option_4=self.sentence(1, 6),
+                    correct_option=self.rng.randint(1, 4),
+                ))
+            questions = Question.objects.bulk_create(questions, batch_size=self.batch_size)
+        return exam, questions
+
+    def create_attempts(self, exam, questions, users):
+        """Answer with an item-response model: candidate ability vs. question difficulty."""
+        rng = self.rng
+        # (question id, correct 0-based option, wrong options, difficulty)
+        paper = [
+            (q.id, q.correct_option - 1, [o for o in range(4) if o != q.correct_option - 1], rng.gauss(0, 1))
+            for q in questions
+        ]
+
+        # QuestionStatus rows go through executemany: model instances cost
+        # more than generating the data itself at this volume.
+        qn = connection.ops.quote_name
+        meta = QuestionStatus._meta
+        columns = [meta.get_field(name).column for name in ('attempt', 'question', 'selected_option', 'status')]
+        insert_sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            qn(meta.db_table), ', '.join(qn(c) for c in columns), ', '.join(['%s'] * len(columns))
+        )
+
+        status_count = 0
+        per_batch = max(self.batch_size // max(len(questions), 1), 1)
+        for start in range(0, len(users), per_batch):
+            chunk = users[start:start + per_batch]
+            with transaction.atomic():
+                attempts = StudentAttempt.objects.bulk_create([StudentAttempt(user=u, exam=exam) for u in chunk])
+                rows = []
+                for attempt in attempts:
+                    ability = rng.gauss(0.5, 1)
+                    skip_rate = rng.uniform(0.0, 0.15)
+                    for question_id, correct, wrong, hardness in paper:
+                        marked = rng.random() < 0.05
+                        if rng.random() < skip_rate:
+                            rows.append((attempt.id, question_id, None,
+                                         'marked' if marked else rng.choice(('not_answered', 'not_visited'))))
+                        else:
+                            if rng.random() < 1 / (1 + math.exp(hardness - ability)):
+                                selected = correct
+                            else:
+                                selected = rng.choice(wrong)
+                            rows.append((attempt.id, question_id, selected, 'ans_marked' if marked else 'answered'))
+                with connection.cursor() as cursor:
+                    cursor.executemany(insert_sql, rows)
+                status_count += len(rows)
+        return status_count
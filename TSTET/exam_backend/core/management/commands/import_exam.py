@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from core.bundle import BundleError, ExamBundle
+from core.models import ArchivedAttempt, Exam, Section, Question, StudentAttempt
+from core.paper import GENERAL_SECTION_ID, invalidate_paper
+
+
+class Command(BaseCommand):
+    help = 'Import an exam paper from a binary bundle in one transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, help='Path to .tstet bundle')
+        parser.add_argument('--new-ids', action='store_true',
+                            help='Assign fresh primary keys; the bundle must then not be served from PAPER_BUNDLE_DIR')
+        parser.add_argument('--replace', action='store_true',
+                            help='Replace an existing exam with the same ID/name, if it has no attempts')
+
+    def handle(self, *args, **options):
+        try:
+            bundle = ExamBundle(options['file'])
+        except (OSError, BundleError) as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+
+        # By default the exported ids are kept, so nodes serving the bundle
+        # directly hand out the question ids this database scores against
+        keep_ids = not options['new_ids']
+        try:
+            with transaction.atomic():
+                error = self.remove_existing(bundle.exam, keep_ids, options['replace'])
+                if error:
+                    self.stdout.write(self.style.ERROR(error))
+                    return
+
+                exam = Exam.objects.create(
+                    id=bundle.exam['id'] if keep_ids else None,
+                    name=bundle.exam['name'],
+                    duration_minutes=bundle.exam['duration_minutes'],
+                )
+                sections = Section.objects.bulk_create([
+                    Section(
+                        id=s['id'] if keep_ids else None, exam=exam,
+                        name=s['name'], part_number=s['part_number'], order=s['order'],
+                    )
+                    for s in bundle.sections
+                ])
+                section_map = {old['id']: new for old, new in zip(bundle.sections, sections)}
+
+                questions = [
+                    Question(
+                        id=q['id'] if keep_ids else None,
+                        exam=exam,
+                        section=section_map.get(q['section_id']) if q['section_id'] not in (None, GENERAL_SECTION_ID) else None,
+                        question_number=q['question_number'],
+                        text=q['text'],
+                        option_1=q['option_1'],
+                        option_2=q['option_2'],
+                        option_3=q['option_3'],
+                        option_4=q['option_4'],
+                        correct_option=q['correct_option'],
+                    )
+                    for q in bundle.questions()
+                ]
+                Question.objects.bulk_create(questions, batch_size=1000)
+
+                if keep_ids:
+                    # Explicit ids do not advance PostgreSQL sequences
+                    with connection.cursor() as cursor:
+                        for sql in connection.ops.sequence_reset_sql(no_style(), [Exam, Section, Question]):
+                            cursor.execute(sql)
+        except IntegrityError as e:
+            self.stdout.write(self.style.ERROR(f'Could not import with the exported ids ({e}); try --new-ids'))
+            return
+        finally:
+            bundle.close()
+
+        # bulk_create sends no signals
+        invalidate_paper(exam.id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {exam.name} (ID: {exam.id}): {len(sections)} sections, {len(questions)} questions'
+        ))
+
+    def remove_existing(self, exam, keep_ids, replace):
+        """Delete the exam this import replaces; returns an error message if it may not."""
+        if keep_ids:
+            existing = list(Exam.objects.filter(id=exam['id']))
+            if existing and existing[0].name != exam['name']:
+                return f'Exam ID {exam["id"]} is already used by {existing[0].name}; use --new-ids'
+        else:
+            existing = list(Exam.objects.filter(name=exam['name']))
+            if len(existing) > 1:
+                return f'{len(existing)} exams are named {exam["name"]}; rename all but the one to replace'
+        if not existing:
+            return None
+
+        if not replace:
+            return f'Exam {exam["name"]} already exists; use --replace to overwrite it'
+        # Deleting the exam would cascade to candidates' results
+        if (StudentAttempt.objects.filter(exam=existing[0]).exists()
+                or ArchivedAttempt.objects.filter(exam=existing[0]).exists()):
+            return f'Exam {exam["name"]} has attempts; refusing to replace it'
+        existing[0].delete()
+        return None
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Preload exam papers and section metadata into the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam-id', type=int, action='append', help='Exam to warm (repeatable, default: all)')
+        parser.add_argument('--import-profile', type=int, nargs='?', const=25, metavar='N',
+                            help='Instead of warming, show the N slowest imports of app startup')
+
+    def handle(self, *args, **options):
+        if options['import_profile']:
+            self.import_profile(options['import_profile'])
+            return
+
+        started = time.monotonic()
+        warmed = warm_up(options['exam_id'])
+        for manifest in warmed:
+            self.stdout.write(f'  {manifest["name"]}: {len(manifest["sections"])} sections, {manifest["total_questions"]} questions')
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {len(warmed)} exams in {time.monotonic() - started:.2f}s'
+        ))
+        if warmed and 'LocMemCache' in settings.CACHES['default']['BACKEND']:
+            self.stdout.write(self.style.WARNING(
+                'The default cache is in-process; use WARM_CACHE_ON_STARTUP to warm server workers'
+            ))
+
+    def import_profile(self, top):
+        """Run a fresh interpreter with -X importtime over Django setup and the URLconf."""
+        code = 'import django; django.setup(); import exam_backend.urls'
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'exam_backend.settings')}
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, env=env)
+
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((int(cumulative_us), int(self_us), name.strip()))
+        if not rows:
+            self.stdout.write(self.style.ERROR(result.stderr or 'No import timings captured'))
+            return
+
+        total = sum(self_us for _, self_us, _ in rows)
+        self.stdout.write(f'Total import time: {total / 1000:.1f} ms over {len(rows)} modules')
+        self.stdout.write(f'{"cumulative ms":>14} {"self ms":>9}  module')
+        for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+            self.stdout.write(f'{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}')
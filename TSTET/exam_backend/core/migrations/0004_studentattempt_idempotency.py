@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from core.archive import pack_statuses, summarize_statuses
+
+
+def archive_duplicate_attempts(apps, schema_editor):
+    """Keep each candidate's first attempt per exam and archive the rest.
+
+    Concurrent submits and the admin could create several attempts for one
+    (user, exam); the unique constraint below needs one. The extra attempts
+    move to ArchivedAttempt so their results are not lost.
+    """
+    StudentAttempt = apps.get_model('core', 'StudentAttempt')
+    QuestionStatus = apps.get_model('core', 'QuestionStatus')
+    ArchivedAttempt = apps.get_model('core', 'ArchivedAttempt')
+
+    duplicates = (
+        StudentAttempt.objects.values('user_id', 'exam_id')
+        .annotate(count=Count('id'), first_id=Min('id'))
+        .filter(count__gt=1)
+    )
+    archived = 0
+    for group in duplicates:
+        extras = StudentAttempt.objects.filter(user_id=group['user_id'], exam_id=group['exam_id']).exclude(id=group['first_id'])
+        for attempt in extras:
+            statuses = list(
+                QuestionStatus.objects.filter(attempt=attempt).select_related('question__section').order_by('id')
+            )
+            correct, total, section_scores = summarize_statuses(statuses)
+            ArchivedAttempt.objects.create(
+                user_id=attempt.user_id,
+                exam_id=attempt.exam_id,
+                original_attempt_id=attempt.id,
+                started_at=attempt.started_at,
+                score=correct,
+                total=total,
+                section_scores=section_scores,
+                statuses=pack_statuses(statuses),
+            )
+            attempt.delete()
+            archived += 1
+    if archived:
+        print(f'\n  Archived {archived} duplicate attempts before adding unique_attempt_per_user_exam')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_archivedattempt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentattempt',
+            name='completed',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='studentattempt',
+            name='idempotency_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='studentattempt',
+            name='response',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(archive_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentattempt',
+            constraint=models.UniqueConstraint(fields=('user', 'exam'), name='unique_attempt_per_user_exam'),
+        ),
+    ]
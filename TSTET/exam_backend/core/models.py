@@ -41,6 +41,16 @@ class StudentAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     started_at = models.DateTimeField(auto_now_add=True)
+    # Set by submit_exam so retries with the same Idempotency-Key replay `response`;
+    # completed stays False while the submission is being scored.
+    idempotency_key = models.CharField(max_length=64, blank=True, default='')
+    completed = models.BooleanField(default=True)
+    response = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exam'], name='unique_attempt_per_user_exam'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.exam.name}"
@@ -55,4 +65,26 @@ class QuestionStatus(models.Model):
         ('answered', 'Answered'),
         ('marked', 'Marked for Review'),
         ('ans_marked', 'Answered & Marked')
-    ])
\ No newline at end of file
+    ])
+
+class ArchivedAttempt(models.Model):
+    """Finished attempt moved out of the hot tables by `archive_attempts`.
+
+    The score summary is stored precomputed; the per-question statuses are
+    kept as a zlib-compressed JSON blob and only decoded on demand.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    original_attempt_id = models.BigIntegerField(unique=True)
+    started_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    score = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    section_scores = models.JSONField(default=dict)
+    statuses = models.BinaryField()
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'exam'])]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.exam.name} (archived)"
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Exam, Section, Question
+from .serializers import QuestionSerializer, SectionSerializer
+
+# Manifest and section chunks are cached per exam under a version number
+# that is bumped whenever the paper changes (see core/signals.py).
+PAPER_CACHE_TTL = getattr(settings, 'PAPER_CACHE_TTL', 3600)
+
+GENERAL_SECTION_ID = 0
+
+
+def _version(exam_id):
+    # Seeded from the clock so a version key lost to eviction never
+    # reuses a number that still has stale chunks cached under it.
+    return cache.get_or_set(f'paper:{exam_id}:version', time.time_ns(), None)
+
+
+def invalidate_paper(exam_id):
+    try:
+        cache.incr(f'paper:{exam_id}:version')
+    except ValueError:
+        cache.set(f'paper:{exam_id}:version', time.time_ns(), None)
+
+
+def _etag(data):
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return '"%s"' % hashlib.md5(body.encode('utf-8')).hexdigest()
+
+
+def build_manifest(exam_id):
+    """Section ids, question ids and counts for an exam, without any question text."""
+    exam = Exam.objects.filter(id=exam_id).values('id', 'name', 'duration_minutes').first()
+    if exam is None:
+        return None
+
+    sections = {}
+    for section in Section.objects.filter(exam_id=exam_id).order_by('order', 'part_number').values('id', 'name', 'part_number', 'order'):
+        sections[section['id']] = {**section, 'question_ids': [], 'question_numbers': []}
+
+    rows = Question.objects.filter(exam_id=exam_id).order_by('section__order', 'question_number').values_list('section_id', 'id', 'question_number')
+    for section_id, question_id, question_number in rows:
+        if section_id is None:
+            section_id = GENERAL_SECTION_ID
+            if section_id not in sections:
+                sections[section_id] = {'id': section_id, 'name': 'General', 'part_number': 0, 'order': 0, 'question_ids': [], 'question_numbers': []}
+        sections[section_id]['question_ids'].append(question_id)
+        sections[section_id]['question_numbers'].append(question_number)
+
+    section_list = [s for s in sections.values() if s['question_ids']]
+    for section in section_list:
+        section['question_count'] = len(section['question_ids'])
+
+    return {
+        'exam_id': exam['id'],
+        'name': exam['name'],
+        'duration_minutes': exam['duration_minutes'],
+        'total_questions': sum(s['question_count'] for s in section_list),
+        'sections': section_list,
+    }
+
+
+def build_section_payload(exam_id, section_id):
+    questions = Question.objects.filter(exam_id=exam_id).select_related('section').order_by('question_number')
+    if section_id == GENERAL_SECTION_ID:
+        questions = questions.filter(section__isnull=True)
+    else:
+        questions = questions.filter(section_id=section_id)
+    return QuestionSerializer(questions, many=True).data
+
+
+def _bundle(exam_id):
+    from .bundle import get_bundle
+    return get_bundle(exam_id)
+
+
+def get_manifest(exam_id):
+    """Return {'etag', 'data'} for the exam manifest, or None if the exam does not exist."""
+    bundle = _bundle(exam_id)
+    if bundle is not None:
+        return {'etag': bundle.etag('manifest'), 'data': bundle.manifest}
+    key = f'paper:{exam_id}:v{_version(exam_id)}:manifest'
+    cached = cache.get(key)
+    if cached is None:
+        data = build_manifest(exam_id)
+        if data is None:
+            return None
+        cached = {'etag': _etag(data), 'data': data}
+        cache.set(key, cached, PAPER_CACHE_TTL)
+    return cached
+
+
+def get_section_payload(exam_id, section_id):
+    """Return {'etag', 'data'} with the full questions of one section, or
+    None if the exam has no such section."""
+    bundle = _bundle(exam_id)
+    if bundle is not None:
+        data = bundle.section_questions(section_id)
+        return None if data is None else {'etag': bundle.etag(section_id), 'data': data}
+    key = f'paper:{exam_id}:v{_version(exam_id)}:section:{section_id}'
+    cached = cache.get(key)
+    if cached is None:
+        # Only sections listed in the manifest get an entry, so arbitrary
+        # ids from clients cannot fill the cache
+        manifest = get_manifest(exam_id)
+        if manifest is None or not any(s['id'] == section_id for s in manifest['data']['sections']):
+            return None
+        data = [dict(q) for q in build_section_payload(exam_id, section_id)]
+        cached = {'etag': _etag(data), 'data': data}
+        cache.set(key, cached, PAPER_CACHE_TTL)
+    return cached
+
+
+def _cached(exam_id, name, build):
+    key = f'paper:{exam_id}:v{_version(exam_id)}:{name}'
+    cached = cache.get(key)
+    if cached is None:
+        cached = build()
+        cache.set(key, cached, PAPER_CACHE_TTL)
+    return cached
+
+
+def get_full_paper(exam_id):
+    """All questions of an exam in one list, as served by /questions/."""
+    bundle = _bundle(exam_id)
+    if bundle is not None:
+        return bundle.questions()
+
+    def build():
+        questions = Question.objects.filter(exam_id=exam_id).select_related('section').order_by('section__order', 'question_number')
+        return [dict(q) for q in QuestionSerializer(questions, many=True).data]
+    return _cached(exam_id, 'questions', build)
+
+
+def get_sections(exam_id):
+    bundle = _bundle(exam_id)
+    if bundle is not None:
+        counts = {s['id']: s['question_count'] for s in bundle.manifest['sections']}
+        return [{**section, 'question_count': counts.get(section['id'], 0)} for section in bundle.sections]
+
+    def build():
+        sections = Section.objects.filter(exam_id=exam_id).order_by('order', 'part_number')
+        return [dict(s) for s in SectionSerializer(sections, many=True).data]
+    return _cached(exam_id, 'sections', build)
+
+
+def get_answer_key(exam_id):
+    """{question_id: (correct_option, section_id, section_name)} for scoring submissions.
+
+    Read from the database on every submit (one query) rather than cached,
+    so a corrected answer applies in every worker at once.
+    """
+    rows = Question.objects.filter(exam_id=exam_id).values_list('id', 'correct_option', 'section_id', 'section__name')
+    return {
+        question_id: (correct, section_id or GENERAL_SECTION_ID, section_name or 'General')
+        for question_id, correct, section_id, section_name in rows
+    }
+
+
+def warm_exam(exam_id):
+    """Load every cached view of an exam's paper; returns the manifest or None."""
+    cached = get_manifest(exam_id)
+    if cached is None:
+        return None
+    get_sections(exam_id)
+    get_full_paper(exam_id)
+    for section in cached['data']['sections']:
+        get_section_payload(exam_id, section['id'])
+    return cached['data']
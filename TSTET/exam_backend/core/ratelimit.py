@@ -0,0 +1,148 @@
+import itertools
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .tokens import verify_token
+
+# Per-endpoint-class limits as (burst capacity, refill tokens per second).
+DEFAULT_RATE_LIMITS = {
+    'default': (60, 1.0),
+    'questions': (10, 0.2),
+    'paper': (60, 2.0),
+    'attempts': (10, 0.2),
+    'submit': (20, 1.0),
+}
+RATE_LIMITS = {**DEFAULT_RATE_LIMITS, **getattr(settings, 'RATE_LIMITS', {})}
+
+# Cache alias to share buckets between workers (approximate and much slower,
+# see _consume_shared); None keeps them in-process.
+RATE_LIMIT_CACHE = getattr(settings, 'RATE_LIMIT_CACHE', None)
+
+# Per endpoint class; once full, fully refilled buckets are dropped and then
+# the oldest PRUNE_FRACTION, so pruning runs at most once per that many inserts.
+MAX_BUCKETS = 50000
+PRUNE_FRACTION = 0.1
+
+# endpoint class -> {user id: [tokens left, last refill time]}
+_buckets = {}
+# endpoint class -> (capacity, rate, capacity as a string, strings for 0..capacity)
+_limits = {}
+_monotonic = time.monotonic
+
+
+def reset():
+    _buckets.clear()
+    _limits.clear()
+
+
+def _limit(endpoint):
+    capacity, rate = RATE_LIMITS.get(endpoint) or RATE_LIMITS['default']
+    # Precomputed so the hot path indexes a tuple instead of calling str()
+    strings = tuple(str(n) for n in range(min(capacity, 1000) + 1))
+    _limits[endpoint] = limit = (capacity, rate, str(capacity), strings)
+    _buckets.setdefault(endpoint, {})
+    return limit
+
+
+def _prune(buckets, now, capacity, rate):
+    """Make room in a full bucket table in one amortised pass."""
+    for key, bucket in list(buckets.items()):
+        if bucket[0] + (now - bucket[1]) * rate >= capacity:
+            del buckets[key]
+    excess = len(buckets) - int(MAX_BUCKETS * (1 - PRUNE_FRACTION))
+    if excess > 0:
+        # Dicts keep insertion order, so these are the longest-tracked users
+        for key in list(itertools.islice(buckets, excess)):
+            del buckets[key]
+
+
+def check(user_id, endpoint):
+    """Take one request from the (user, endpoint class) bucket.
+
+    Returns (tokens, limit, remaining, reset): the tokens that were
+    available before this request, below 1 meaning it is over the limit
+    and nothing was taken, then the RateLimit-* header values.
+    """
+    capacity, rate, limit, strings = _limits.get(endpoint) or _limit(endpoint)
+    if RATE_LIMIT_CACHE:
+        tokens = _consume_shared(user_id, endpoint, capacity, rate)
+    else:
+        now = _monotonic()
+        buckets = _buckets[endpoint]
+        bucket = buckets.get(user_id)
+        if bucket is None:
+            if len(buckets) >= MAX_BUCKETS:
+                _prune(buckets, now, capacity, rate)
+            buckets[user_id] = [capacity - 1, now]
+            tokens = capacity
+        else:
+            tokens = bucket[0] + (now - bucket[1]) * rate
+            if tokens > capacity:
+                tokens = capacity
+            bucket[1] = now
+            bucket[0] = tokens - 1 if tokens >= 1 else tokens
+
+    if tokens < 1:
+        return tokens, limit, '0', _seconds((1 - tokens) / rate)
+    remaining = int(tokens - 1)
+    return (
+        tokens,
+        limit,
+        strings[remaining] if remaining < len(strings) else str(remaining),
+        _seconds((capacity - tokens + 1) / rate),
+    )
+
+
+def _seconds(value):
+    # ceil() for the non-negative reset delay, as a header string
+    whole = int(value)
+    return str(whole + 1 if value > whole else whole)
+
+
+def _consume_shared(user_id, endpoint, capacity, rate):
+    # Wall-clock time here because monotonic clocks differ between processes.
+    # Read-modify-write is not atomic: concurrent requests of one user on
+    # different workers can each take the same token, so the limit is
+    # approximate. Costs a cache round trip each way (see bench_ratelimit).
+    cache = caches[RATE_LIMIT_CACHE]
+    cache_key = f'ratelimit:{endpoint}:{user_id}'
+    now = time.time()
+    bucket = cache.get(cache_key) or [capacity, now]
+    tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+    cache.set(cache_key, [tokens - 1 if tokens >= 1 else tokens, now], int(capacity / rate) + 1)
+    return tokens
+
+
+def rate_limited(endpoint):
+    """Token-bucket limit a view per verified user and endpoint class.
+
+    Apply below @api_view. Requests without a valid token are passed
+    through so the view answers them with 401; they never get a bucket.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            user_id = verify_token(request)
+            if user_id is None:
+                return view(request, *args, **kwargs)
+
+            tokens, limit, remaining, reset_after = check(user_id, endpoint)
+            if tokens < 1:
+                return Response({'error': 'Too many requests'}, status=429, headers={
+                    'RateLimit-Limit': limit,
+                    'RateLimit-Remaining': remaining,
+                    'RateLimit-Reset': reset_after,
+                    'Retry-After': reset_after,
+                })
+
+            response = view(request, *args, **kwargs)
+            response['RateLimit-Limit'] = limit
+            response['RateLimit-Remaining'] = remaining
+            response['RateLimit-Reset'] = reset_after
+            return response
+        return wrapper
+    return decorator
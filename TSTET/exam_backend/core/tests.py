@@ -1,3 +1,640 @@
-from django.test import TestCase
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import ratelimit, views
+from .bundle import HEADER, BundleError, ExamBundle, bundle_filename, get_bundle
+from .models import Exam, Section, Question, StudentAttempt, QuestionStatus, ArchivedAttempt
+from .live import EventAggregator, aggregator, event_stream
+from .paper import get_manifest, get_section_payload
+from .views import user_tokens
+from .warmup import warm_up, warm_up_on_startup
+
+# Tests clear the cache freely, so they get their own file-based one in a
+# temp dir instead of the real cache under BASE_DIR/cache
+TEST_CACHE_DIR = tempfile.mkdtemp(prefix='tstet-test-cache-')
+_test_cache = override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEST_CACHE_DIR,
+    }
+})
+
+
+def setUpModule():
+    _test_cache.enable()
+
+
+def tearDownModule():
+    _test_cache.disable()
+    shutil.rmtree(TEST_CACHE_DIR, ignore_errors=True)
+
+
+class ExamFixtureMixin:
+    """A candidate with a valid API token and a one-section exam."""
+    question_count = 3
+
+    def setUp(self):
+        cache.clear()
+        ratelimit.reset()
+        aggregator.reset()
+        self.user = User.objects.create_user(username='candidate', password='secret')
+        self.token = 'test-token'
+        user_tokens[self.token] = self.user.id
+        self.exam = Exam.objects.create(name='Test Exam')
+        self.section = Section.objects.create(exam=self.exam, name='Maths', part_number=1, order=1)
+        self.questions = [
+            Question.objects.create(
+                exam=self.exam, section=self.section, question_number=i + 1, text=f'Q{i + 1}',
+                option_1='A', option_2='B', option_3='C', option_4='D', correct_option=1
+            )
+            for i in range(self.question_count)
+        ]
+
+    def tearDown(self):
+        user_tokens.pop(self.token, None)
+
+    def api_get(self, url, **extra):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token}', **extra)
+
+    def api_post(self, url, data, **extra):
+        return self.client.post(url, data, content_type='application/json', HTTP_AUTHORIZATION=f'Token {self.token}', **extra)
+
+    def submit(self, answers=None, **extra):
+        if answers is None:
+            answers = [{'question_id': q.id, 'selected_option': 0} for q in self.questions]
+        return self.api_post('/api/submit-exam/', {'exam_id': self.exam.id, 'answers': answers}, **extra)
+
+
+class ExamApiTestCase(ExamFixtureMixin, TestCase):
+    pass
+
+
+class ArchiveAttemptsTests(ExamApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit([
+            {'question_id': self.questions[0].id, 'selected_option': 0},
+            {'question_id': self.questions[1].id, 'selected_option': 2},
+            {'question_id': self.questions[2].id, 'selected_option': None},
+        ])
+        self.other_exam = Exam.objects.create(name='Other Exam')
+        other_user = User.objects.create_user(username='other', password='secret')
+        StudentAttempt.objects.create(user=other_user, exam=self.other_exam)
+
+    def archive(self, **options):
+        out = io.StringIO()
+        call_command('archive_attempts', stdout=out, **options)
+        return out.getvalue()
+
+    def test_filters_by_exam(self):
+        self.assertIn('Archived 1 attempts', self.archive(exam_id=[self.exam.id]))
+        self.assertEqual(list(ArchivedAttempt.objects.values_list('exam_id', flat=True)), [self.exam.id])
+        self.assertEqual(list(StudentAttempt.objects.values_list('exam_id', flat=True)), [self.other_exam.id])
+        self.assertFalse(QuestionStatus.objects.exists())
+
+    def test_filters_by_age(self):
+        StudentAttempt.objects.filter(exam=self.other_exam).update(started_at=timezone.now() - timedelta(days=40))
+        self.assertIn('Archived 1 attempts', self.archive(older_than=30))
+        self.assertEqual(list(ArchivedAttempt.objects.values_list('exam_id', flat=True)), [self.other_exam.id])
+        self.assertIn('Archived 0 attempts', self.archive(older_than=30, exam_id=[self.exam.id]))
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('Would archive 2 attempts', self.archive(older_than=0, dry_run=True))
+        self.assertEqual(StudentAttempt.objects.count(), 2)
+        self.assertFalse(ArchivedAttempt.objects.exists())
+
+    def test_archived_attempts_on_demand(self):
+        live = self.api_get('/api/user-attempts/').json()
+        self.archive(exam_id=[self.exam.id])
+        self.assertEqual(self.api_get('/api/user-attempts/').json(), [])
+
+        summary = self.api_get('/api/user-attempts/?include_archived=1').json()
+        self.assertEqual(len(summary), 1)
+        self.assertTrue(summary[0]['archived'])
+        self.assertNotIn('statuses', summary[0])
+        for field in ('exam_id', 'score', 'total', 'section_scores', 'attempted_at'):
+            self.assertEqual(summary[0][field], live[0][field])
+
+        detailed = self.api_get('/api/user-attempts/?include_archived=1&include_statuses=1').json()
+        self.assertEqual(detailed[0]['statuses'], [
+            {'question_id': self.questions[0].id, 'selected_option': 0, 'status': 'answered'},
+            {'question_id': self.questions[1].id, 'selected_option': 2, 'status': 'answered'},
+            {'question_id': self.questions[2].id, 'selected_option': None, 'status': 'not_answered'},
+        ])
+
+    def test_archived_attempt_blocks_resubmission(self):
+        self.archive(exam_id=[self.exam.id])
+        response = self.submit()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Already attempted')
+        self.assertFalse(StudentAttempt.objects.filter(exam=self.exam).exists())
+
+    def test_clear_history_allows_retaking_archived_exams(self):
+        self.archive(exam_id=[self.exam.id])
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+        page = self.client.get('/admin/core/exam/clear-history/')
+        self.assertContains(page, '<strong>Archived Attempts:</strong> 1')
+
+        self.client.post('/admin/core/exam/clear-history/')
+        self.assertFalse(ArchivedAttempt.objects.exists())
+        self.assertEqual(self.submit().status_code, 200)
+
+
+class SubmitExamIdempotencyTests(ExamFixtureMixin, TransactionTestCase):
+    # Threads need committed rows, hence TransactionTestCase
+    question_count = 5
+
+    def submit(self, key):
+        return super().submit(HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        first = self.submit('key-1')
+        second = self.submit('key-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(StudentAttempt.objects.count(), 1)
+
+    def test_new_key_hits_already_attempted(self):
+        self.submit('key-1')
+        response = self.submit('key-2')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Already attempted')
+
+    def test_parallel_duplicates_score_once(self):
+        responses = []
+        barrier = threading.Barrier(8)
+
+        def fire():
+            barrier.wait()
+            try:
+                responses.append(self.submit('storm'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=fire) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Duplicates either replay the result or are told to retry shortly
+        for response in responses:
+            if response.status_code == 409:
+                self.assertEqual(response['Retry-After'], '1')
+            else:
+                self.assertEqual(response.status_code, 200)
+        ok = [r.json()['attempt_id'] for r in responses if r.status_code == 200]
+        self.assertTrue(ok)
+        self.assertEqual(len(set(ok)), 1)
+        self.assertEqual(StudentAttempt.objects.count(), 1)
+        self.assertEqual(QuestionStatus.objects.count(), len(self.questions))
+
+        retry = self.submit('storm')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['attempt_id'], ok[0])
+
+    def test_in_flight_duplicate_gets_409(self):
+        StudentAttempt.objects.create(user=self.user, exam=self.exam, idempotency_key='key-1', completed=False)
+        response = self.submit('key-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_attempt_released_while_scoring_gets_409(self):
+        real_answer_key = views.get_answer_key
+
+        def release_then_score(exam_id):
+            StudentAttempt.objects.filter(completed=False).delete()
+            return real_answer_key(exam_id)
+
+        with mock.patch.object(views, 'get_answer_key', release_then_score):
+            response = self.submit('key-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        # Nothing half-scored was committed
+        self.assertFalse(QuestionStatus.objects.exists())
+        self.assertFalse(StudentAttempt.objects.filter(completed=True).exists())
+
+    def test_stale_pending_attempt_is_released(self):
+        attempt = StudentAttempt.objects.create(user=self.user, exam=self.exam, idempotency_key='key-1', completed=False)
+        StudentAttempt.objects.filter(id=attempt.id).update(started_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(self.submit('key-1').status_code, 409)
+        self.assertEqual(self.submit('key-1').status_code, 200)
+
+
+class DuplicateAttemptMigrationTests(TransactionTestCase):
+    migrate_from = [('core', '0003_archivedattempt')]
+    migrate_to = [('core', '0004_studentattempt_idempotency')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_are_archived_before_the_constraint(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        user = apps.get_model('auth', 'User').objects.create(username='twice')
+        exam = apps.get_model('core', 'Exam').objects.create(name='Old Exam', duration_minutes=150)
+        question = apps.get_model('core', 'Question').objects.create(
+            exam=exam, question_number=1, text='Q1', option_1='A', option_2='B', option_3='C', option_4='D', correct_option=1
+        )
+        Attempt = apps.get_model('core', 'StudentAttempt')
+        first, second = Attempt.objects.create(user=user, exam=exam), Attempt.objects.create(user=user, exam=exam)
+        apps.get_model('core', 'QuestionStatus').objects.create(attempt=second, question=question, selected_option=0, status='answered')
+
+        executor = MigrationExecutor(connection)
+        with contextlib.redirect_stdout(io.StringIO()):
+            executor.migrate(self.migrate_to)
+        self.assertEqual(list(StudentAttempt.objects.values_list('id', flat=True)), [first.id])
+        archived = ArchivedAttempt.objects.get()
+        self.assertEqual((archived.original_attempt_id, archived.score, archived.total), (second.id, 1, 1))
+
+
+class RateLimitTests(ExamApiTestCase):
+
+    def test_refresh_loop_is_throttled(self):
+        burst = ratelimit.RATE_LIMITS['attempts'][0]
+        responses = [
+            self.api_get('/api/user-attempts/')
+            for _ in range(burst + 1)
+        ]
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertEqual(responses[0]['RateLimit-Limit'], str(burst))
+        self.assertEqual(responses[0]['RateLimit-Remaining'], str(burst - 1))
+        self.assertEqual(responses[burst - 1].status_code, 200)
+        self.assertEqual(responses[burst].status_code, 429)
+        self.assertIn('Retry-After', responses[burst])
+
+        # Other endpoint classes keep their own bucket
+        self.assertEqual(self.api_get('/api/exams/').status_code, 200)
+
+        # A fresh login does not come with a fresh budget
+        user_tokens['second-token'] = self.user.id
+        try:
+            response = self.client.get('/api/user-attempts/', HTTP_AUTHORIZATION='Token second-token')
+        finally:
+            user_tokens.pop('second-token', None)
+        self.assertEqual(response.status_code, 429)
+
+    def test_shared_buckets_are_seen_by_every_worker(self):
+        burst = ratelimit.RATE_LIMITS['attempts'][0]
+        with mock.patch.object(ratelimit, 'RATE_LIMIT_CACHE', 'default'):
+            for _ in range(burst):
+                self.assertEqual(self.api_get('/api/user-attempts/').status_code, 200)
+            # Another worker has no in-process bucket but reads the shared one
+            ratelimit.reset()
+            self.assertEqual(self.api_get('/api/user-attempts/').status_code, 429)
+        self.assertFalse(ratelimit._buckets.get('attempts'))
+
+    def test_unverified_tokens_get_no_bucket(self):
+        for n in range(5):
+            response = self.client.get('/api/user-attempts/', HTTP_AUTHORIZATION=f'Token forged-{n}')
+            self.assertEqual(response.status_code, 401)
+        self.assertFalse(ratelimit._buckets.get('attempts'))
+
+    def test_full_table_is_pruned_in_one_pass(self):
+        with mock.patch.object(ratelimit, 'MAX_BUCKETS', 100):
+            for user_id in range(100):
+                ratelimit.check(user_id, 'attempts')
+            ratelimit.check(100, 'attempts')
+            buckets = ratelimit._buckets['attempts']
+            self.assertEqual(len(buckets), 91)
+            self.assertNotIn(0, buckets)
+            self.assertIn(100, buckets)
+
+
+class ChunkedPaperTests(ExamApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        science = Section.objects.create(exam=self.exam, name='Science', part_number=2, order=2)
+        for number in range(4, 7):
+            Question.objects.create(
+                exam=self.exam, section=science, question_number=number, text=f'Q{number}',
+                option_1='A', option_2='B', option_3='C', option_4='D', correct_option=1
+            )
+        self.sections = [self.section, science]
+
+    def test_manifest_lists_sections_without_text(self):
+        manifest = self.api_get(f'/api/exam/{self.exam.id}/manifest/').json()
+        self.assertEqual(manifest['total_questions'], 6)
+        self.assertEqual([s['id'] for s in manifest['sections']], [s.id for s in self.sections])
+        self.assertEqual(manifest['sections'][1]['question_numbers'], [4, 5, 6])
+        self.assertNotIn('text', str(manifest['sections']))
+
+    def test_section_chunk_is_cacheable(self):
+        url = f'/api/exam/{self.exam.id}/section/{self.sections[0].id}/questions/'
+        first = self.api_get(url)
+        self.assertEqual([q['text'] for q in first.json()], ['Q1', 'Q2', 'Q3'])
+        self.assertEqual(self.api_get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        Question.objects.filter(question_number=1).get().delete()
+        changed = self.api_get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([q['text'] for q in changed.json()], ['Q2', 'Q3'])
+
+    def test_edit_is_visible_to_other_workers(self):
+        # A second connection stands in for another worker's cache handle
+        other_worker = caches.create_connection('default')
+        self.assertIsNotNone(get_manifest(self.exam.id))
+        version_key = f'paper:{self.exam.id}:version'
+        before = other_worker.get(version_key)
+        self.section.name = 'Mathematics'
+        self.section.save()
+        self.assertNotEqual(other_worker.get(version_key), before)
+
+    def test_unknown_section_is_404_and_not_cached(self):
+        for url in (f'/api/exam/{self.exam.id}/section/9999/questions/', '/api/exam/9999/section/1/questions/'):
+            self.assertEqual(self.api_get(url).status_code, 404)
+        self.assertIsNone(get_section_payload(self.exam.id, 9999))
+        version = cache.get(f'paper:{self.exam.id}:version')
+        self.assertIsNone(cache.get(f'paper:{self.exam.id}:v{version}:section:9999'))
+
+
+class ResultsExportTests(ExamApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+        candidate = User.objects.create_user(username='student', password='secret')
+        attempt = StudentAttempt.objects.create(user=candidate, exam=self.exam)
+        for question, selected in zip(self.questions, [0, 1, None]):
+            QuestionStatus.objects.create(
+                attempt=attempt, question=question, selected_option=selected,
+                status='answered' if selected is not None else 'not_answered'
+            )
+
+    def export(self, kind):
+        response = self.api_get(f'/api/exam/{self.exam.id}/results/export/?kind={kind}')
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_candidate_csv(self):
+        lines = self.export('candidates')
+        self.assertEqual(lines[0], 'exam_id,attempt_id,username,started_at,score,total')
+        row = lines[1].split(',')
+        self.assertEqual(row[2], 'student')
+        self.assertEqual(row[-2:], ['1', '3'])
+
+    def test_question_csv(self):
+        lines = self.export('questions')
+        self.assertEqual(len(lines), 4)
+        self.assertEqual([line.split(',')[-2] for line in lines[1:]], ['True', 'False', 'False'])
+
+    def test_archived_attempts_are_exported(self):
+        expected = {kind: self.export(kind) for kind in ('candidates', 'questions')}
+        call_command('archive_attempts', exam_id=[self.exam.id], stdout=io.StringIO())
+        self.assertFalse(StudentAttempt.objects.exists())
+        for kind, lines in expected.items():
+            self.assertEqual(self.export(kind), lines)
+
+    def test_requires_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.api_get(f'/api/exam/{self.exam.id}/results/export/')
+        self.assertEqual(response.status_code, 403)
+
+
+class LiveAggregatorTests(ExamApiTestCase):
+    question_count = 1
+
+    def test_exam_flow_updates_counters(self):
+        token = self.client.post(
+            '/api-token-auth/', {'username': 'candidate', 'password': 'secret'}, content_type='application/json'
+        ).json()['token']
+        auth = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        self.client.get(f'/api/exam/{self.exam.id}/manifest/', **auth)
+        snapshot = aggregator.snapshot()
+        self.assertEqual(snapshot['logged_in'], 1)
+        self.assertEqual(snapshot['exams'][self.exam.id]['in_progress'], 1)
+
+        self.client.post('/api/submit-exam/', {
+            'exam_id': self.exam.id, 'answers': [{'question_id': self.questions[0].id, 'selected_option': 0}]
+        }, content_type='application/json', **auth)
+        stats = aggregator.snapshot()['exams'][self.exam.id]
+        self.assertEqual((stats['started'], stats['submitted'], stats['in_progress']), (1, 1, 0))
+        self.assertEqual(stats['average_percent'], 100.0)
+        self.assertEqual(stats['submits_last_minute'], 1)
+        user_tokens.pop(token, None)
+
+    def test_snapshot_merges_workers(self):
+        other_worker = EventAggregator()
+        aggregator.record_login(self.user.id)
+        other_worker.record_login(self.user.id)
+        other_worker.record_login(999)
+        other_worker.record_submit(self.exam.id, 999, 1, 1)
+        # Its flush timer would publish these within LIVE_PUBLISH_INTERVAL
+        other_worker.publish()
+        snapshot = aggregator.snapshot()
+        self.assertEqual(snapshot['logged_in'], 2)
+        self.assertEqual(snapshot['logins_last_minute'], 3)
+        self.assertEqual(snapshot['exams'][self.exam.id]['submitted'], 1)
+
+    def test_unknown_exam_adds_no_dashboard_row(self):
+        response = self.api_get(f'/api/exam/{self.exam.id + 100}/questions/')
+        self.assertEqual(response.json(), [])
+        self.assertNotIn(self.exam.id + 100, aggregator.snapshot()['exams'])
+
+    def test_reset_cancels_pending_flush(self):
+        worker = EventAggregator()
+        worker.record_login(self.user.id)
+        # Published at once; a second change inside the interval is deferred
+        worker.record_login(999)
+        timer = worker._flush_timer
+        self.assertIsNotNone(timer)
+        worker.reset()
+        self.assertIsNone(worker._flush_timer)
+        self.assertTrue(timer.finished.is_set())
+
+    def test_stream_ends_and_asks_to_reconnect(self):
+        messages = list(event_stream(interval=0, events=3))
+        self.assertEqual(messages[0], 'retry: 0\n\n')
+        self.assertEqual(len(messages), 4)
+        self.assertTrue(all(m.startswith('data: ') for m in messages[1:]))
+
+
+class GenerateDatasetTests(TestCase):
+    options = dict(exams=1, sections=2, questions=4, users=3, attempts=2, seed=7, prefix='gen', stdout=io.StringIO())
+
+    def dataset(self):
+        """Generated rows without database ids, for comparing runs."""
+        exam = Exam.objects.get(name='gen exam 1')
+        questions = list(exam.question_set.order_by('question_number').values_list(
+            'question_number', 'section__name', 'text', 'option_1', 'option_4', 'correct_option'
+        ))
+        answers = list(QuestionStatus.objects.filter(attempt__exam=exam).order_by(
+            'attempt__user__username', 'question__question_number'
+        ).values_list('attempt__user__username', 'question__question_number', 'selected_option', 'status'))
+        return questions, answers
+
+    def test_seeded_runs_are_reproducible(self):
+        call_command('generate_dataset', **self.options)
+        self.assertEqual(User.objects.filter(username__startswith='gen_user_').count(), 3)
+        self.assertEqual(Section.objects.count(), 2)
+        self.assertEqual(Question.objects.count(), 4)
+        self.assertEqual(StudentAttempt.objects.count(), 2)
+        self.assertEqual(QuestionStatus.objects.count(), 8)
+        first = self.dataset()
+
+        Exam.objects.all().delete()
+        User.objects.all().delete()
+        call_command('generate_dataset', **self.options)
+        self.assertEqual(self.dataset(), first)
+
+    def test_existing_prefix_is_refused(self):
+        call_command('generate_dataset', **self.options)
+        out = io.StringIO()
+        call_command('generate_dataset', **{**self.options, 'stdout': out})
+        self.assertIn('already exists', out.getvalue())
+        self.assertEqual(Exam.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 3)
+
+
+class WarmCacheTests(ExamApiTestCase):
+    question_count = 1
+
+    def test_scoring_reads_answer_key_from_database_after_warm_up(self):
+        warmed = warm_up()
+        self.assertEqual([m['exam_id'] for m in warmed], [self.exam.id])
+        # Warming caches the paper only; an edit made afterwards still scores
+
+        question = self.questions[0]
+        question.correct_option = 2
+        question.save()
+        response = self.submit([{'question_id': question.id, 'selected_option': 1}])
+        self.assertEqual(response.json()['score'], 1)
+
+    def test_startup_hook_primes_the_application(self):
+        # Keep the test transaction's connection open, as the test client does
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+        try:
+            with mock.patch('core.warmup.connections'), self.assertLogs('core.warmup', 'INFO') as logs:
+                warm_up_on_startup(get_wsgi_application())
+        finally:
+            for signal in (request_started, request_finished):
+                signal.connect(close_old_connections)
+        self.assertIn('Warmed 1 exam papers', logs.output[0])
+        self.assertIsNotNone(cache.get(f'paper:{self.exam.id}:v{cache.get(f"paper:{self.exam.id}:version")}:manifest'))
+
+
+class ExamBundleTests(ExamApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Question.objects.create(
+            exam=self.exam, question_number=4, text='Unsectioned ' * 50,
+            option_1='A', option_2='B', option_3='C', option_4='D', correct_option=4
+        )
+        self.path = os.path.join(tempfile.mkdtemp(), bundle_filename(self.exam.id))
+        call_command('export_exam', self.exam.id, output=self.path, stdout=io.StringIO())
+
+    def test_bundle_serves_same_paper(self):
+        bundle = ExamBundle(self.path)
+        self.assertEqual(bundle.manifest, get_manifest(self.exam.id)['data'])
+        for section in bundle.manifest['sections']:
+            self.assertEqual(bundle.section_questions(section['id']), get_section_payload(self.exam.id, section['id'])['data'])
+        bundle.close()
+
+    def test_import_round_trip(self):
+        old_texts = list(Question.objects.order_by('question_number').values_list('id', 'text', 'section__name', 'correct_option'))
+        exam_id = self.exam.id
+        self.exam.delete()
+        call_command('import_exam', self.path, stdout=io.StringIO())
+        exam = Exam.objects.get(name='Test Exam')
+        self.assertEqual(exam.id, exam_id)
+        self.assertEqual(exam.duration_minutes, 150)
+        self.assertEqual(
+            list(Question.objects.filter(exam=exam).order_by('question_number').values_list('id', 'text', 'section__name', 'correct_option')),
+            old_texts
+        )
+
+    def test_corrupt_bundle_is_rejected(self):
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        with self.assertRaises(BundleError):
+            ExamBundle(self.path)
+
+    def test_unreadable_bundles_are_reported_by_import(self):
+        empty = os.path.join(os.path.dirname(self.path), 'empty.tstet')
+        open(empty, 'wb').close()
+        # The checksum covers the index but not its length in the header
+        with open(self.path, 'r+b') as f:
+            magic, version, index_length, digest = HEADER.unpack(f.read(HEADER.size))
+            f.seek(0)
+            f.write(HEADER.pack(magic, version, index_length - 1, digest))
+        for path, error in [(empty, 'truncated header'), (self.path, 'unreadable index')]:
+            out = io.StringIO()
+            call_command('import_exam', path, stdout=out)
+            self.assertIn(error, out.getvalue())
+        self.assertEqual(Exam.objects.count(), 1)
+
+    def test_replace_keeps_exams_with_attempts(self):
+        self.submit()
+        out = io.StringIO()
+        call_command('import_exam', self.path, replace=True, stdout=out)
+        self.assertIn('has attempts', out.getvalue())
+        self.assertEqual(StudentAttempt.objects.count(), 1)
+
+        StudentAttempt.objects.all().delete()
+        call_command('import_exam', self.path, replace=True, stdout=io.StringIO())
+        self.assertEqual(Exam.objects.get().id, self.exam.id)
+
+    def test_paper_is_served_from_bundle(self):
+        url = f'/api/exam/{self.exam.id}/section/{self.section.id}/questions/'
+        expected = self.api_get(url).json()
+        with override_settings(PAPER_BUNDLE_DIR=os.path.dirname(self.path)):
+            self.assertIsNotNone(get_bundle(self.exam.id))
+            with self.assertNumQueries(0):
+                response = self.api_get(url)
+        self.assertEqual(response.json(), expected)
+        self.assertTrue(response['ETag'].startswith('"bundle-'))
+
+    def test_unusable_bundle_falls_back_to_database(self):
+        url = f'/api/exam/{self.exam.id}/manifest/'
+        with override_settings(PAPER_BUNDLE_DIR=os.path.dirname(self.path)):
+            Question.objects.filter(question_number=4).delete()
+            with self.assertLogs('core.bundle', 'ERROR'):
+                response = self.api_get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['total_questions'], 3)
+            # Not reopened until the file changes
+            with self.assertNoLogs('core.bundle', 'ERROR'):
+                self.api_get(url)
+
+    def test_edited_paper_stops_serving_bundle(self):
+        url = f'/api/exam/{self.exam.id}/section/{self.section.id}/questions/'
+        with override_settings(PAPER_BUNDLE_DIR=os.path.dirname(self.path)):
+            self.assertTrue(self.api_get(url)['ETag'].startswith('"bundle-'))
+            question = Question.objects.get(question_number=1)
+            question.text = 'Edited in the admin'
+            question.save()
+            with self.assertLogs('core.bundle', 'ERROR'):
+                response = self.api_get(url)
+        self.assertFalse(response['ETag'].startswith('"bundle-'))
+        self.assertIn('Edited in the admin', [q['text'] for q in response.json()])
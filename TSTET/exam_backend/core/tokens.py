@@ -0,0 +1,32 @@
+# Simple token storage - NOTE: This resets when server restarts!
+# For production, use database or Django REST Framework's Token model
+user_tokens = {}
+
+def verify_token(request):
+    # Memoised on the request: @rate_limited has usually verified it already
+    try:
+        return request.token_user_id
+    except AttributeError:
+        pass
+    request.token_user_id = user_id = _verify_token(request)
+    return user_id
+
+def _verify_token(request):
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not auth_header:
+        print("No auth header found")
+        return None
+    try:
+        parts = auth_header.split()
+        if len(parts) != 2 or parts[0] != 'Token':
+            print(f"Invalid auth header format: {auth_header}")
+            return None
+        token = parts[1]
+        if token in user_tokens:
+            return user_tokens[token]
+        else:
+            print(f"Token not found in user_tokens. Token: {token[:8]}..., Available: {len(user_tokens)} tokens")
+            return None
+    except Exception as e:
+        print(f"Token verification error: {e}")
+        return None
@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import get_exams, get_exam_questions, get_exam_sections, submit_exam, get_user_attempts
+from .views import get_exams, get_exam_questions, get_exam_sections, get_exam_manifest, get_section_questions, export_exam_results, submit_exam, get_user_attempts
 
 urlpatterns = [
     path('exams/', get_exams, name='get_exams'),
     path('exam/<int:exam_id>/sections/', get_exam_sections, name='get_exam_sections'),
     path('exam/<int:exam_id>/questions/', get_exam_questions, name='get_exam_questions'),
+    path('exam/<int:exam_id>/manifest/', get_exam_manifest, name='get_exam_manifest'),
+    path('exam/<int:exam_id>/section/<int:section_id>/questions/', get_section_questions, name='get_section_questions'),
+    path('exam/<int:exam_id>/results/export/', export_exam_results, name='export_exam_results'),
     path('submit-exam/', submit_exam, name='submit_exam'),
     path('user-attempts/', get_user_attempts, name='user_attempts'),
 ]
\ No newline at end of file
@@ -1,14 +1,20 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Question, Exam, Section, StudentAttempt, QuestionStatus
-from .serializers import QuestionSerializer, ExamSerializer, SectionSerializer
+from .models import Exam, StudentAttempt, QuestionStatus, ArchivedAttempt
+from .serializers import ExamSerializer
+from .archive import summarize_statuses, unpack_statuses
+from .ratelimit import rate_limited
+from .tokens import user_tokens, verify_token
+from .paper import get_manifest, get_section_payload, get_full_paper, get_sections, get_answer_key
+from .export import EXPORTS, export_response
+from .live import aggregator
 import uuid
-
-# Simple token storage - NOTE: This resets when server restarts!
-# For production, use database or Django REST Framework's Token model
-user_tokens = {}
+from datetime import timedelta
 
 @api_view(['POST'])
 def login_view(request):
@@ -20,31 +26,13 @@ def login_view(request):
         # Generate new token
         token = str(uuid.uuid4())
         user_tokens[token] = user.id
+        aggregator.record_login(user.id)
         print(f"Login successful. Token: {token[:8]}..., User: {username}, Total tokens: {len(user_tokens)}")
         return Response({'token': token, 'user_id': user.id})
     return Response({'error': 'Invalid credentials'}, status=401)
 
-def verify_token(request):
-    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-    if not auth_header:
-        print("No auth header found")
-        return None
-    try:
-        parts = auth_header.split()
-        if len(parts) != 2 or parts[0] != 'Token':
-            print(f"Invalid auth header format: {auth_header}")
-            return None
-        token = parts[1]
-        if token in user_tokens:
-            return user_tokens[token]
-        else:
-            print(f"Token not found in user_tokens. Token: {token[:8]}..., Available: {len(user_tokens)} tokens")
-            return None
-    except Exception as e:
-        print(f"Token verification error: {e}")
-        return None
-
 @api_view(['GET'])
+@rate_limited('default')
 def get_exams(request):
     user_id = verify_token(request)
     if not user_id:
@@ -55,127 +43,251 @@ def get_exams(request):
     return Response(serializer.data)
 
 @api_view(['GET'])
+@rate_limited('default')
 def get_exam_sections(request, exam_id):
     user_id = verify_token(request)
     if not user_id:
         return Response({'error': 'Unauthorized'}, status=401)
     
-    sections = Section.objects.filter(exam_id=exam_id).order_by('order', 'part_number')
-    serializer = SectionSerializer(sections, many=True)
-    return Response(serializer.data)
+    return Response(get_sections(exam_id))
 
 @api_view(['GET'])
+@rate_limited('questions')
 def get_exam_questions(request, exam_id):
     user_id = verify_token(request)
     if not user_id:
         return Response({'error': 'Unauthorized'}, status=401)
     
-    questions = Question.objects.filter(exam_id=exam_id).select_related('section').order_by('section__order', 'question_number')
-    serializer = QuestionSerializer(questions, many=True)
-    return Response(serializer.data)
+    # The cached manifest confirms the exam exists without another query,
+    # so unknown ids keep their empty paper but add no dashboard row
+    if get_manifest(exam_id) is not None:
+        aggregator.record_start(exam_id, user_id)
+    return Response(get_full_paper(exam_id))
+
+PAPER_MAX_AGE = getattr(settings, 'PAPER_MAX_AGE', 300)
+
+def _cacheable(request, cached):
+    """Response for a cached paper chunk, honouring If-None-Match."""
+    headers = {'ETag': cached['etag'], 'Cache-Control': f'private, max-age={PAPER_MAX_AGE}'}
+    if request.META.get('HTTP_IF_NONE_MATCH') == cached['etag']:
+        return Response(status=304, headers=headers)
+    return Response(cached['data'], headers=headers)
+
+@api_view(['GET'])
+@rate_limited('questions')
+def get_exam_manifest(request, exam_id):
+    """Lightweight paper outline: sections with their question ids and counts."""
+    user_id = verify_token(request)
+    if not user_id:
+        return Response({'error': 'Unauthorized'}, status=401)
+    
+    cached = get_manifest(exam_id)
+    if cached is None:
+        return Response({'error': 'Exam not found'}, status=404)
+    aggregator.record_start(exam_id, user_id)
+    return _cacheable(request, cached)
+
+@api_view(['GET'])
+@rate_limited('paper')
+def get_section_questions(request, exam_id, section_id):
+    """Full questions of one section (section 0 holds unsectioned questions)."""
+    user_id = verify_token(request)
+    if not user_id:
+        return Response({'error': 'Unauthorized'}, status=401)
+    
+    cached = get_section_payload(exam_id, section_id)
+    if cached is None:
+        return Response({'error': 'Section not found'}, status=404)
+    return _cacheable(request, cached)
+
+# Idempotent submissions: the attempt row itself records the client's key and
+# the response, so a retry on any worker replays it. The unique (user, exam)
+# constraint makes concurrent duplicates fail on insert instead of racing.
+SUBMIT_PENDING_TIMEOUT = getattr(settings, 'SUBMIT_PENDING_TIMEOUT', 60)
+
+class _AttemptReleased(Exception):
+    pass
+
+def _existing_submission(user_id, exam_id, idempotency_key):
+    """Response for a submit whose (user, exam) attempt already exists, or None."""
+    attempt = StudentAttempt.objects.filter(user_id=user_id, exam_id=exam_id).values(
+        'id', 'idempotency_key', 'completed', 'response', 'started_at'
+    ).first()
+    if attempt is None:
+        archived = ArchivedAttempt.objects.filter(user_id=user_id, exam_id=exam_id).values_list('original_attempt_id', flat=True).first()
+        if archived:
+            return Response({'error': 'Already attempted', 'attempt_id': archived}, status=400)
+        return None
+    
+    if not attempt['completed']:
+        # A worker that died mid-scoring must not block the candidate for good
+        cutoff = timezone.now() - timedelta(seconds=SUBMIT_PENDING_TIMEOUT)
+        if attempt['started_at'] < cutoff:
+            StudentAttempt.objects.filter(id=attempt['id'], completed=False).delete()
+        return Response({'error': 'Submission in progress'}, status=409, headers={'Retry-After': '1'})
+    
+    if idempotency_key and attempt['idempotency_key'] == idempotency_key and attempt['response'] is not None:
+        return Response(attempt['response'], headers={'Idempotent-Replayed': 'true'})
+    return Response({'error': 'Already attempted', 'attempt_id': attempt['id']}, status=400)
 
 @api_view(['POST'])
+@rate_limited('submit')
 def submit_exam(request):
-    """Save exam attempt to database"""
+    """Save exam attempt to database.
+
+    Clients may send an Idempotency-Key header (or idempotency_key field);
+    a retry with the same key replays the stored response, and a retry
+    that arrives while the first is still being scored gets 409.
+    """
     user_id = verify_token(request)
     if not user_id:
         return Response({'error': 'Unauthorized'}, status=401)
     
+    exam_id = request.data.get('exam_id')
+    answers = request.data.get('answers', [])
+    idempotency_key = str(request.META.get('HTTP_IDEMPOTENCY_KEY') or request.data.get('idempotency_key') or '')
+    if len(idempotency_key) > 64:
+        return Response({'error': 'Idempotency key too long'}, status=400)
+    
+    existing = _existing_submission(user_id, exam_id, idempotency_key)
+    if existing is not None:
+        return existing
+    return _submit_exam(user_id, exam_id, answers, idempotency_key)
+
+def _submit_exam(user_id, exam_id, answers, idempotency_key):
     try:
         user = User.objects.get(id=user_id)
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=404)
     
-    exam_id = request.data.get('exam_id')
-    answers = request.data.get('answers', [])
-    
     try:
         exam = Exam.objects.get(id=exam_id)
     except Exam.DoesNotExist:
         return Response({'error': 'Exam not found'}, status=404)
     
-    # Check if already attempted
-    existing = StudentAttempt.objects.filter(user=user, exam=exam).first()
-    if existing:
-        return Response({'error': 'Already attempted', 'attempt_id': existing.id}, status=400)
+    # Claim the (user, exam) slot in its own commit so duplicates see it at once
+    try:
+        with transaction.atomic():
+            attempt = StudentAttempt.objects.create(user=user, exam=exam, idempotency_key=idempotency_key, completed=False)
+    except IntegrityError:
+        return _existing_submission(user.id, exam.id, idempotency_key) or Response(
+            {'error': 'Submission in progress'}, status=409, headers={'Retry-After': '1'}
+        )
     
-    # Create attempt record
-    attempt = StudentAttempt.objects.create(user=user, exam=exam)
+    try:
+        with transaction.atomic():
+            response = _score_attempt(attempt, answers)
+    except _AttemptReleased:
+        # Another request released our row as stale; its retry takes over
+        return Response({'error': 'Submission in progress'}, status=409, headers={'Retry-After': '1'})
+    except Exception:
+        attempt.delete()
+        raise
     
-    # Calculate scores per section
+    aggregator.record_submit(exam.id, user.id, response['score'], response['total'])
+    return Response(response)
+
+def _score_attempt(attempt, answers):
+    """Score answers, store their statuses and complete the attempt; returns the response body.
+
+    Raises _AttemptReleased if the pending row was released as stale.
+    """
+    # Lock the pending row so it cannot be released while we score it
+    if not StudentAttempt.objects.select_for_update().filter(id=attempt.id, completed=False).exists():
+        raise _AttemptReleased
+    # Calculate scores per section from the answer key
+    answer_key = get_answer_key(attempt.exam_id)
     section_scores = {}
     total_correct = 0
     total_questions = 0
+    statuses = []
     
     for ans in answers:
         question_id = ans.get('question_id')
         selected = ans.get('selected_option')
         
         try:
-            question = Question.objects.select_related('section').get(id=question_id)
-            total_questions += 1
-            
-            section_id = question.section.id if question.section else 0
-            if section_id not in section_scores:
-                section_scores[section_id] = {'correct': 0, 'total': 0, 'name': question.section.name if question.section else 'General'}
-            
-            section_scores[section_id]['total'] += 1
-            
-            is_correct = False
-            if selected is not None:
-                is_correct = (selected + 1) == question.correct_option
-                if is_correct:
-                    total_correct += 1
-                    section_scores[section_id]['correct'] += 1
-            
-            status = 'answered' if selected is not None else 'not_answered'
-            QuestionStatus.objects.create(
-                attempt=attempt,
-                question=question,
-                selected_option=selected,
-                status=status
-            )
-        except Question.DoesNotExist:
+            correct_option, section_id, section_name = answer_key[int(question_id)]
+        except (KeyError, TypeError, ValueError):
             continue
+        total_questions += 1
+        
+        if section_id not in section_scores:
+            section_scores[section_id] = {'correct': 0, 'total': 0, 'name': section_name}
+        
+        section_scores[section_id]['total'] += 1
+        
+        if selected is not None:
+            if (selected + 1) == correct_option:
+                total_correct += 1
+                section_scores[section_id]['correct'] += 1
+        
+        status = 'answered' if selected is not None else 'not_answered'
+        statuses.append(QuestionStatus(
+            attempt=attempt,
+            question_id=int(question_id),
+            selected_option=selected,
+            status=status
+        ))
     
-    return Response({
+    QuestionStatus.objects.bulk_create(statuses)
+    
+    response = {
         'message': 'Exam submitted successfully',
         'attempt_id': attempt.id,
         'score': total_correct,
         'total': total_questions,
         'section_scores': section_scores
-    })
+    }
+    if not StudentAttempt.objects.filter(id=attempt.id, completed=False).update(completed=True, response=response):
+        raise _AttemptReleased
+    return response
+
+@api_view(['GET'])
+@rate_limited('default')
+def export_exam_results(request, exam_id):
+    """Stream an exam's results (staff only).
+
+    ?kind=candidates|questions, ?format=csv|parquet (parquet needs pyarrow).
+    """
+    user_id = verify_token(request)
+    if not user_id:
+        return Response({'error': 'Unauthorized'}, status=401)
+    if not User.objects.filter(id=user_id, is_staff=True).exists():
+        return Response({'error': 'Forbidden'}, status=403)
+    
+    kind = request.query_params.get('kind', 'candidates')
+    fmt = request.query_params.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in ('csv', 'parquet'):
+        return Response({'error': 'Unknown kind or format'}, status=400)
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return Response({'error': 'Parquet export requires pyarrow'}, status=400)
+    if not Exam.objects.filter(id=exam_id).exists():
+        return Response({'error': 'Exam not found'}, status=404)
+    
+    return export_response(kind, [exam_id], fmt)
 
 @api_view(['GET'])
+@rate_limited('attempts')
 def get_user_attempts(request):
-    """Get all attempts for current user with scores"""
+    """Get all attempts for current user with scores.
+
+    Pass ?include_archived=1 to also return attempts moved out by archive_attempts,
+    and ?include_statuses=1 to decode their per-question statuses.
+    """
     user_id = verify_token(request)
     if not user_id:
         return Response({'error': 'Unauthorized'}, status=401)
     
-    attempts = StudentAttempt.objects.filter(user_id=user_id).select_related('exam')
+    attempts = StudentAttempt.objects.filter(user_id=user_id, completed=True).select_related('exam')
     
     result = []
     for attempt in attempts:
         statuses = QuestionStatus.objects.filter(attempt=attempt).select_related('question__section')
-        total = statuses.count()
-        correct = 0
-        
-        section_scores = {}
-        for status in statuses:
-            section = status.question.section
-            section_id = section.id if section else 0
-            section_name = section.name if section else 'General'
-            
-            if section_id not in section_scores:
-                section_scores[section_id] = {'name': section_name, 'correct': 0, 'total': 0}
-            
-            section_scores[section_id]['total'] += 1
-            
-            if status.selected_option is not None:
-                if (status.selected_option + 1) == status.question.correct_option:
-                    correct += 1
-                    section_scores[section_id]['correct'] += 1
+        correct, total, section_scores = summarize_statuses(statuses)
         
         result.append({
             'exam_id': attempt.exam.id,
@@ -186,4 +298,23 @@ def get_user_attempts(request):
             'attempted_at': attempt.started_at.isoformat()
         })
     
-    return Response(result)
\ No newline at end of file
+    if request.query_params.get('include_archived') in ('1', 'true'):
+        include_statuses = request.query_params.get('include_statuses') in ('1', 'true')
+        archived = ArchivedAttempt.objects.filter(user_id=user_id).select_related('exam')
+        if not include_statuses:
+            archived = archived.defer('statuses')
+        for attempt in archived:
+            entry = {
+                'exam_id': attempt.exam.id,
+                'exam_name': attempt.exam.name,
+                'score': attempt.score,
+                'total': attempt.total,
+                'section_scores': attempt.section_scores,
+                'attempted_at': attempt.started_at.isoformat(),
+                'archived': True
+            }
+            if include_statuses:
+                entry['statuses'] = unpack_statuses(attempt.statuses)
+            result.append(entry)
+    
+    return Response(result)
@@ -0,0 +1,73 @@
+import logging
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import get_resolver, reverse
+from rest_framework.renderers import JSONRenderer
+
+from .models import Exam
+from .paper import warm_exam
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_request_stack(application):
+    """Send one unauthenticated API request through the WSGI application.
+
+    The first request otherwise pays for lazy middleware setup, session and
+    messages imports and DRF's parser/renderer negotiation. It is answered
+    with 401 before any database access.
+    """
+    host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+    environ = {'PATH_INFO': reverse('get_exams'), 'HTTP_HOST': host}
+    setup_testing_defaults(environ)
+    response = application(environ, lambda status, headers, exc_info=None: None)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+
+
+def warm_up(exam_ids=None, application=None):
+    """Compile URL patterns, prime the request stack and load the cached paper of each exam.
+
+    exam_ids defaults to settings.WARM_CACHE_EXAMS, or every exam when that
+    is None. The request stack is only primed when a WSGI application is
+    given. Returns the manifests that were warmed.
+    """
+    get_resolver().url_patterns
+    if application is not None:
+        _warm_request_stack(application)
+
+    if exam_ids is None:
+        exam_ids = getattr(settings, 'WARM_CACHE_EXAMS', None)
+    if exam_ids is None:
+        exam_ids = list(Exam.objects.values_list('id', flat=True))
+
+    renderer = JSONRenderer()
+    warmed = []
+    for exam_id in exam_ids:
+        manifest = warm_exam(exam_id)
+        if manifest is not None:
+            renderer.render(manifest)
+            warmed.append(manifest)
+    return warmed
+
+
+def warm_up_on_startup(application):
+    """Startup hook called from wsgi.py after the application is built (WARM_CACHE_ON_STARTUP).
+
+    Only server processes load wsgi.py, so manage.py commands never warm.
+    Under `gunicorn --preload` it runs once before workers fork. Failures
+    only log: a server must still start against an unmigrated database.
+    """
+    try:
+        warmed = warm_up(application=application)
+        logger.info('Warmed %d exam papers at startup', len(warmed))
+    except DatabaseError as e:
+        logger.warning('Skipping cache warm-up: %s', e)
+    finally:
+        # Never hand an open connection to forked workers
+        connections.close_all()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -81,6 +82,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock up front so concurrent submits queue on
+        # busy_timeout instead of failing with "database is locked".
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -116,6 +121,57 @@ USE_I18N = True
 USE_TZ = True
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['ETag', 'RateLimit-Limit', 'RateLimit-Remaining', 'RateLimit-Reset', 'Retry-After']
+
+# A submission still being scored after this many seconds is treated as
+# crashed and may be retried (seconds).
+SUBMIT_PENDING_TIMEOUT = 60
+
+# Per-user request limits by endpoint class as (burst, tokens refilled per
+# second), overriding DEFAULT_RATE_LIMITS in core/ratelimit.py for the
+# classes listed, e.g. {'paper': (120, 4.0)}.
+RATE_LIMITS = {}
+
+# Buckets live in each worker's memory by default (about 1-2 us per check).
+# Setting a cache alias shares them between workers, but every check then
+# costs a cache read and write: ~0.3 ms with the FileBasedCache below, much
+# less with Redis/Memcached. The read-modify-write is not atomic, so under
+# concurrent requests from one user the shared limit is approximate.
+RATE_LIMIT_CACHE = None
+
+# Shared by every worker on this host, so a paper edit saved through one
+# worker invalidates the cached copies the others serve. Use Redis or
+# Memcached instead when workers run on more than one host.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+# Paper manifest/section chunks: server-side cache TTL and client max-age (seconds).
+PAPER_CACHE_TTL = 3600
+PAPER_MAX_AGE = 300
+
+# Directory of exam-<id>.tstet bundles (see export_exam). Exams with a bundle
+# there have their paper served from it read-only instead of the database;
+# submissions are still scored from the database, so a bundle whose question
+# ids differ from it is skipped.
+PAPER_BUNDLE_DIR = None
+
+# Preload exam papers and section metadata into the cache, and send one
+# request through the app, when a server loads wsgi.py. WARM_CACHE_EXAMS
+# limits it to a list of exam ids.
+WARM_CACHE_ON_STARTUP = False
+WARM_CACHE_EXAMS = None
+
+# Seconds between live proctor dashboard updates pushed over Server-Sent Events.
+LIVE_DASHBOARD_INTERVAL = 2
+# Updates sent per Server-Sent Events response; the browser then reconnects,
+# so an open dashboard tab never holds a worker for long.
+LIVE_STREAM_EVENTS = 15
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'exam_backend.settings')
 
 application = get_wsgi_application()
+
+if getattr(settings, 'WARM_CACHE_ON_STARTUP', False):
+    from core.warmup import warm_up_on_startup
+    warm_up_on_startup(application)